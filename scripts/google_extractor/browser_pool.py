@@ -0,0 +1,232 @@
+# browser_pool.py
+# -*- coding: utf-8 -*-
+
+"""
+A shared Playwright Chromium instance for JS-rendered extraction.
+The browser is launched on first use and reused; each request gets its own
+cheap browser context, and the browser is closed again after a period of inactivity.
+The Playwright driver itself is started once and kept until the pool is closed.
+With PLAYWRIGHT_CDP_URL set (environment or .env), the pool connects to an already running browser
+(see start_browser_server.py) instead, so several worker processes share one Chromium.
+Chromium runs sandboxed unless PLAYWRIGHT_NO_SANDBOX=1 is set (for containers that need it).
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from playwright.async_api import (
+        async_playwright, Browser, BrowserContext, Playwright, Error as PlaywrightError
+    )
+    PLAYWRIGHT_AVAILABLE = True
+    logger.info("Playwright found and available.")
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    # Define placeholders
+    Browser = BrowserContext = Playwright = Any
+    PlaywrightError = Exception
+    logger.info("Playwright not found. JS rendering will not be available.")
+
+from config import PLAYWRIGHT_MAX_CONCURRENCY, PLAYWRIGHT_IDLE_TIMEOUT, chrome_sandbox_disabled, get_chrome_args, get_playwright_cdp_url
+
+
+class PlaywrightPool:
+    """
+    Lazily launches (or connects to) one headless Chromium and hands out isolated browser contexts.
+
+    At most `max_concurrency` contexts are open at once; further callers wait.
+    A crashed or disconnected browser is relaunched on the next acquire(); concurrent
+    callers share a single in-flight launch instead of each starting a browser.
+    The driver and browser belong to the event loop they were started in; used from a
+    new loop (e.g. a second asyncio.run), the pool starts over instead of reusing them.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = PLAYWRIGHT_MAX_CONCURRENCY,
+        idle_timeout: float = PLAYWRIGHT_IDLE_TIMEOUT,
+        cdp_url: Optional[str] = None
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of contexts (pages being rendered) at once.
+            idle_timeout: Seconds without any open context after which the browser is closed
+                (or, when connected over CDP, disconnected; the shared browser keeps running).
+            cdp_url: Endpoint of a running Chromium to connect to over CDP. If None,
+                PLAYWRIGHT_CDP_URL is read when the browser is first needed (so .env values
+                apply); if that is unset too, a local browser is launched.
+        """
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle_timeout = idle_timeout
+        self._cdp_url = cdp_url
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._active = 0
+        self._idle_task: Optional[asyncio.Task] = None
+        self._launch_task: Optional[asyncio.Task] = None
+        # Set when Chromium is not installed; later launches fail fast instead of retrying per URL
+        self._install_error: Optional[Exception] = None
+
+    def _bind_loop(self) -> None:
+        """
+        Ties the pool to the running event loop. State left from a previous loop is dropped:
+        its driver pipe and tasks can't be used (or even closed) from another loop, and
+        the browser may still report is_connected() after that loop has closed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            logger.info("[Playwright] Event loop changed. Starting a new browser for this loop.")
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._playwright = None
+        self._browser = None
+        self._active = 0
+        self._idle_task = None
+        self._launch_task = None
+
+    async def _driver(self) -> Playwright:
+        """
+        Returns the Playwright driver, starting it on first use. The driver outlives idle
+        browser closes, so relaunching the browser skips the driver handshake.
+        """
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return self._playwright
+
+    async def _launch(self) -> Browser:
+        """Launches the browser (replacing a disconnected one). Runs as the shared launch task."""
+        try:
+            if self._install_error is not None:
+                raise self._install_error
+            if self._browser is not None:
+                logger.warning("[Playwright] Browser disconnected. Relaunching.")
+                await self._close_browser()
+            playwright = await self._driver()
+            try:
+                cdp_url = self._cdp_url or get_playwright_cdp_url()
+                if cdp_url:
+                    logger.info("[Playwright] Connecting to shared browser at %s.", cdp_url)
+                    self._browser = await playwright.chromium.connect_over_cdp(cdp_url)
+                else:
+                    no_sandbox = chrome_sandbox_disabled()
+                    logger.info("[Playwright] Launching headless Chromium%s.",
+                                " without sandbox (PLAYWRIGHT_NO_SANDBOX)" if no_sandbox else "")
+                    self._browser = await playwright.chromium.launch(
+                        headless=True,
+                        # Playwright adds --no-sandbox itself unless chromium_sandbox is set
+                        chromium_sandbox=not no_sandbox,
+                        args=list(get_chrome_args())
+                    )
+            except PlaywrightError as e:
+                if "Executable doesn't exist" in str(e):
+                    # Retrying can't help until `playwright install` is run; report it once
+                    logger.error("[Playwright] Chromium is not installed: %s", e)
+                    self._install_error = e
+                else:
+                    # The driver may be what died; start a fresh one on the next attempt
+                    await self._stop_driver()
+                raise
+            return self._browser
+        finally:
+            # Later callers check the browser again (and retry after a failed launch)
+            self._launch_task = None
+
+    async def _ensure_browser(self) -> Browser:
+        """Returns the running browser, (re)launching it if needed."""
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+        # No await between the check and the assignment, so only one launch is started
+        if self._launch_task is None:
+            self._launch_task = asyncio.create_task(self._launch())
+        # Shielded so a cancelled caller does not abort the launch for the others
+        return await asyncio.shield(self._launch_task)
+
+    async def _close_when_idle(self) -> None:
+        """Closes the browser once no context has been open for the idle timeout."""
+        await asyncio.sleep(self._idle_timeout)
+        if self._active == 0:
+            logger.info("[Playwright] Browser idle for %.0f seconds. Closing it.", self._idle_timeout)
+            self._idle_task = None
+            await self._close_browser() # The driver stays up for the next launch
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, **context_options: Any) -> AsyncIterator[BrowserContext]:
+        """
+        Yields a fresh browser context, closed again on exit (the browser stays up).
+
+        Args:
+            **context_options: Passed to Browser.new_context (e.g. user_agent).
+
+        Raises:
+            RuntimeError: If Playwright is not installed.
+            PlaywrightError: If the browser cannot be launched or the context created.
+        """
+        if not PLAYWRIGHT_AVAILABLE:
+            raise RuntimeError("Playwright is not installed.")
+
+        self._bind_loop()
+        async with self._semaphore:
+            self._active += 1
+            if self._idle_task is not None:
+                self._idle_task.cancel()
+                self._idle_task = None
+            context = None
+            try:
+                browser = await self._ensure_browser()
+                context = await browser.new_context(**context_options)
+                yield context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except PlaywrightError as e:
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("[Playwright] Error closing browser context: %s", e)
+                self._active -= 1
+                if self._active == 0 and self._browser is not None:
+                    self._idle_task = asyncio.create_task(self._close_when_idle())
+
+    async def close(self) -> None:
+        """Closes the browser and stops the Playwright driver. The pool can be reused afterwards."""
+        self._bind_loop() # Nothing to close from here if it all belonged to an earlier loop
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            self._idle_task = None
+        if self._launch_task is not None:
+            # Let an in-flight launch finish so its browser is closed too
+            with contextlib.suppress(Exception):
+                await self._launch_task
+        await self._close_browser()
+        await self._stop_driver()
+        self._install_error = None
+
+    async def _close_browser(self) -> None:
+        """
+        Closes the browser, ignoring errors from a dead browser. A browser connected over
+        CDP is only disconnected from; it keeps running for the other workers.
+        """
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except PlaywrightError as e:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("[Playwright] Error closing browser: %s", e)
+
+    async def _stop_driver(self) -> None:
+        """Stops the Playwright driver, if it was started."""
+        playwright, self._playwright = self._playwright, None
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except PlaywrightError as e:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("[Playwright] Error stopping driver: %s", e)
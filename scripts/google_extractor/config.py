@@ -5,32 +5,153 @@
 Configuration settings, constants, and environment variable loading.
 """
 
+import functools
+import importlib.util
 import os
 # import logging
+from typing import Optional, Tuple
+
 from dotenv import load_dotenv
 
 # --- Load Environment Variables ---
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_CUSTOM_SEARCH_API_KEY")
-CSE_ID = os.getenv("GOOGLE_CSE_ID")
+@functools.lru_cache(maxsize=1)
+def _load_env() -> None:
+    """
+    Reads the .env file on the first call only, and into os.environ, so worker processes
+    started afterwards inherit the values without re-reading it.
+    """
+    load_dotenv()
+
+
+def get_credentials() -> Tuple[Optional[str], Optional[str]]:
+    """Returns (API key, CSE ID) from the environment or the .env file."""
+    _load_env()
+    return os.getenv("GOOGLE_CUSTOM_SEARCH_API_KEY"), os.getenv("GOOGLE_CSE_ID")
+
+
+def get_playwright_cdp_url() -> Optional[str]:
+    """
+    Returns PLAYWRIGHT_CDP_URL from the environment or the .env file: the endpoint of a shared
+    browser (see start_browser_server.py) to connect to instead of launching one, or None.
+    """
+    _load_env()
+    return os.getenv("PLAYWRIGHT_CDP_URL") or None
+
+
+def chrome_sandbox_disabled() -> bool:
+    """
+    True if PLAYWRIGHT_NO_SANDBOX (environment or .env) is set to 1/true/yes. Only meant for
+    containers where Chromium's sandbox cannot start; the browser is sandboxed otherwise.
+    """
+    _load_env()
+    return os.getenv("PLAYWRIGHT_NO_SANDBOX", "").strip().lower() in ("1", "true", "yes")
+
+
+def get_chrome_args() -> Tuple[str, ...]:
+    """
+    Returns the Chromium flags to launch with: CHROME_ARGS and CHROME_DISABLED_FEATURES, plus the
+    CHROME_NO_SANDBOX_* flags when opted in. Chromium only honours the last --disable-features
+    switch, so all disabled features go into a single one.
+    """
+    args, features = CHROME_ARGS, CHROME_DISABLED_FEATURES
+    if chrome_sandbox_disabled():
+        args += CHROME_NO_SANDBOX_ARGS
+        features += CHROME_NO_SANDBOX_DISABLED_FEATURES
+    return args + ('--disable-features=' + ','.join(features),)
+
+
+def __getattr__(name: str):
+    """Resolves API_KEY, CSE_ID and PLAYWRIGHT_CDP_URL lazily, so importing config does not touch .env."""
+    if name == "API_KEY":
+        return get_credentials()[0]
+    if name == "CSE_ID":
+        return get_credentials()[1]
+    if name == "PLAYWRIGHT_CDP_URL":
+        return get_playwright_cdp_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Constants ---
 
+# Input Dataset
+VIFACTCHECK_DATASET = "tranthaihoa/vifactcheck" # HuggingFace dataset holding the queries
+QUERY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fact-checking-vn") # Parquet cache of query lists
+
 # Google CSE API
 GOOGLE_API_URL = "https://www.googleapis.com/customsearch/v1"
 DEFAULT_CSE_NUM_RESULTS = 10 # Max 10 per request for CSE API
-DEFAULT_REQUEST_DELAY = 1.0 # Delay between CSE API calls (seconds)
+DEFAULT_CSE_RATE = 10.0 # Max CSE API calls per second (token bucket)
 CSE_API_TIMEOUT = 15 # Timeout for CSE API requests
+CSE_DEDUP_TTL = 300 # Seconds a CSE response is reused for an identical request
+
+# Search Result Filtering (results are dropped before any extraction request)
+SKIPPED_URL_SUFFIXES = ('.pdf', '.doc', '.docx', '.zip') # Non-HTML documents the HTML extractors cannot parse
+SKIPPED_HOSTS = frozenset({ # Sites that need a login or JS; subdomains are skipped too
+    'facebook.com', 'x.com', 'twitter.com', 'instagram.com', 'tiktok.com'
+})
 
 # Text Extraction
 DEFAULT_EXTRACTION_TIMEOUT = 15 # Timeout for fetching each URL (seconds)
+DEFAULT_MAX_CONNECTIONS = 50 # Max concurrent URL extractions in flight
+DEFAULT_EXECUTOR_WORKERS = 32 # Threads for blocking work (HTML parsing, DNS lookups)
+DEFAULT_PARSE_PROCESSES = min(os.cpu_count() or 1, 4) # Worker processes for HTML parsing (0 parses in the thread pool); each costs ~60 MB
+PARSE_OFFLOAD_MIN_CHARS = 32 * 1024 # Smaller documents are parsed in a thread; sending them to a process costs more than parsing
+REQUESTS_LRU_SIZE = 4096 # Successful extractions kept in memory by extract_main_text_requests
+HOST_FAILURE_THRESHOLD = 3 # Consecutive connection failures/timeouts before a host is skipped
+HOST_FAILURE_COOLDOWN = 60 # Seconds a failing host is skipped; doubles with each further failure
+HOST_FAILURE_MAX_COOLDOWN = 900 # Upper bound for the skip period (seconds)
+MAX_CONTENT_LENGTH = 5_000_000 # Responses with a larger body (bytes, declared or after decompression) are skipped
+MAX_PARSE_BYTES = 2_000_000 # Larger documents are cut down to their <body> text markup before trafilatura runs
+USE_RESILIPARSE = True # Extract main text with resiliparse (much faster) when installed; False uses trafilatura
+# Brotli is only advertised when a decoder is installed (urllib3 and aiohttp use either package)
+BROTLI_AVAILABLE = any(importlib.util.find_spec(name) for name in ('brotli', 'brotlicffi'))
 EXTRACTION_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, br, deflate' if BROTLI_AVAILABLE else 'gzip, deflate'
 }
 
+# Shared requests.Session connection pool (synchronous helpers)
+HTTP_POOL_SIZE = 64 # Host pools cached, and connections kept per host
+HTTP_MAX_RETRIES = 2 # Retries on connection/read errors and retryable statuses
+HTTP_RETRY_BACKOFF = 0.3 # Backoff factor between retries (seconds)
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504) # Transient HTTP statuses worth retrying
+
+# Shared aiohttp connection pool (TCPConnector)
+CONNECTOR_LIMIT = 100 # Total simultaneous connections
+CONNECTOR_LIMIT_PER_HOST = 4 # Simultaneous connections to the same host
+CONNECTOR_DNS_CACHE_TTL = 300 # Seconds to cache DNS lookups
+CONNECTOR_KEEPALIVE_TIMEOUT = 30 # Seconds to keep idle connections open
+
+# Shared Playwright browser (JS rendering)
+PLAYWRIGHT_MAX_CONCURRENCY = 4 # Pages rendered at once in the shared browser
+PLAYWRIGHT_IDLE_TIMEOUT = 60 # Seconds without open pages before the browser is closed
+BROWSER_SERVER_PORT = 9222 # Default remote debugging port of start_browser_server.py
+CHROME_ARGS = ( # Chromium flags for headless rendering; subsystems the extractor never uses are off
+    '--disable-dev-shm-usage', # Use /tmp instead of the small /dev/shm of most containers
+    '--disable-gpu', '--disable-extensions', '--disable-background-networking', '--disable-sync',
+    '--disable-default-apps', '--disable-translate', '--no-first-run',
+    '--blink-settings=imagesEnabled=false', # Images are also aborted via BLOCKED_RESOURCE_TYPES
+)
+CHROME_DISABLED_FEATURES = ('VizDisplayCompositor', 'TranslateUI') # Passed as one --disable-features flag
+CHROME_NO_SANDBOX_ARGS = ( # Added only with PLAYWRIGHT_NO_SANDBOX=1; they weaken isolation from the pages rendered
+    '--no-sandbox', '--disable-setuid-sandbox', # For containers lacking the namespaces the sandbox needs
+)
+CHROME_NO_SANDBOX_DISABLED_FEATURES = ('site-per-process',) # Fewer renderer processes, at the cost of site isolation
+BLOCKED_RESOURCE_TYPES = frozenset({ # Requests aborted while rendering; only the HTML text is needed
+    'image', 'media', 'font', 'stylesheet', 'imageset'
+})
+
+# Output Writing
+JSONL_WRITE_BUFFER_SIZE = 1 << 20 # Bytes buffered before each write to a batch file
+JSONL_GZIP_LEVEL = 3 # Compression level for .jsonl.gz batch files (speed over ratio)
+
+# Progress Bars
+PROGRESS_MININTERVAL = 0.5 # Minimum seconds between progress bar redraws
+PROGRESS_URL_MINITERS = 10 # Completed URLs between redraw checks of the URL bar
+
 # Folder Base Naming Defaults
-DEFAULT_EXTRACTED_OUTPUT_BASE = "results/raw_search"
-DEFAULT_SEARCH_OUTPUT_BASE = "results/extracted_text"
+DEFAULT_OUTPUT_BASE = "results/combined"
+DEFAULT_EXTRACTION_CACHE_PATH = "results/extraction_cache.jsonl"
+EXTRACTION_CACHE_TTL = 30 * 24 * 3600 # Seconds a persisted extraction stays valid across runs
 
 # # --- Domains that Require Playwright for JS Rendering ---
 # PLAYWRIGHT_DOMAINS = {
@@ -41,9 +162,10 @@ DEFAULT_SEARCH_OUTPUT_BASE = "results/extracted_text"
 # --- Validation (Optional but Recommended) ---
 def validate_config():
     """Basic check if essential API keys are loaded."""
-    if not API_KEY:
+    api_key, cse_id = get_credentials()
+    if not api_key:
         raise ValueError("Configuration Error: GOOGLE_API_KEY not found in environment/.env")
-    if not CSE_ID:
+    if not cse_id:
         raise ValueError("Configuration Error: GOOGLE_CSE_ID not found in environment/.env")
 
 # You could call validate_config() here if you want it checked on import,
@@ -5,12 +5,41 @@
 Functions for handling data input (reading queries) and potentially output (JSONL writing).
 """
 
+import gzip
 import logging
 import json
-from typing import List, Optional, Dict, TextIO
+import os
+import queue
+import threading
+from typing import BinaryIO, List, Optional, Dict, Iterable, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.info("orjson not found. Falling back to the standard json module.")
+
+from config import JSONL_WRITE_BUFFER_SIZE, JSONL_GZIP_LEVEL, VIFACTCHECK_DATASET, QUERY_CACHE_DIR
+
+
+def _get_dataset_revision(dataset_name: str) -> Optional[str]:
+    """Returns the current commit hash of a HuggingFace dataset, or None if it cannot be resolved."""
+    from huggingface_hub import HfApi
+    try:
+        return HfApi().dataset_info(dataset_name).sha
+    except Exception as e:
+        logger.warning("Could not resolve revision of dataset '%s' (query cache disabled): %s", dataset_name, e)
+        return None
+
+
+def _query_cache_path(revision: str, column_name: str) -> str:
+    """Builds the parquet cache path for the queries of one dataset revision and column."""
+    safe_column = column_name.replace(os.sep, '_')
+    return os.path.join(QUERY_CACHE_DIR, f"{revision}_{safe_column}.parquet")
 
-import pandas as pd
-from datasets import load_dataset, concatenate_datasets
 
 def read_queries_from_vifactcheck(column_name: str) -> Optional[List[str]]:
     """
@@ -23,52 +52,336 @@ def read_queries_from_vifactcheck(column_name: str) -> Optional[List[str]]:
     Returns:
         A list of unique, non-empty queries as strings, or None if an error occurs.
     """
-    logging.info("Reading queries from column '%s'.", column_name)
+    # Imported here: the dataset stack is heavy, and spawned parse workers re-import
+    # main.py (and with it this module) without ever reading queries.
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from datasets import load_dataset
+
+    logger.info("Reading queries from column '%s'.", column_name)
+    revision = _get_dataset_revision(VIFACTCHECK_DATASET)
+    cache_path = _query_cache_path(revision, column_name) if revision else None
+
+    # Reuse the query list computed by a previous run on the same dataset revision
+    if cache_path and os.path.exists(cache_path):
+        try:
+            queries = pq.read_table(cache_path).column(0).to_pylist()
+            logger.info("Loaded %d cached queries from %s", len(queries), cache_path)
+            return queries
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning("Failed to read query cache %s, reloading dataset: %s", cache_path, e)
+
     try:
-        ds = load_dataset("tranthaihoa/vifactcheck")
-        combined = concatenate_datasets([ds['train'], ds['dev'], ds['test']])
-        df = combined.to_pandas()
+        ds = load_dataset(VIFACTCHECK_DATASET, revision=revision)
+        # Stay in Arrow: avoids materializing the whole dataset as a DataFrame
+        table = pa.concat_tables([ds[split].data.table for split in ('train', 'dev', 'test')])
 
-        if column_name not in df.columns:
-            logging.error("Query column '%s' not found. Available columns: %s",
-                          column_name, df.columns.tolist())
+        if column_name not in table.column_names:
+            logger.error("Query column '%s' not found. Available columns: %s",
+                         column_name, table.column_names)
             return None # Indicate column not found error
 
-        # Get unique, non-null queries, convert to string just in case
-        queries = df[column_name].dropna().astype(str).unique().tolist()
+        # Get non-null queries as trimmed strings, then drop empty ones (all vectorized)
+        column = table.column(column_name).combine_chunks().drop_null()
+        column = pc.utf8_trim_whitespace(pc.cast(column, pa.string()))
+        column = pc.filter(column, pc.greater(pc.utf8_length(column), 0))
 
-        # Filter out potentially empty strings after conversion
-        queries = [q for q in queries if q.strip()]
+        # Unique queries, in order of first appearance
+        queries = pc.unique(column).to_pylist()
 
-        logging.info("Read %d unique, non-empty queries from column '%s'.", len(queries), column_name)
+        logger.info("Read %d unique, non-empty queries from column '%s'.", len(queries), column_name)
+        if cache_path:
+            _write_query_cache(cache_path, queries)
         if not queries:
-            logging.warning("No valid, non-empty queries found in the specified column.")
+            logger.warning("No valid, non-empty queries found in the specified column.")
             # Return empty list instead of None if no queries found but file/column were ok
             return []
         return queries
 
     except Exception as e:
-        logging.error("Error reading input: %s", e, exc_info=True)
+        logger.error("Error reading input: %s", e, exc_info=True)
         return None # Indicate other reading error
 
 
-def save_jsonl_record(outfile: TextIO, record: Dict) -> bool:
+def _write_query_cache(cache_path: str, queries: List[str]) -> None:
+    """Stores a query list as a single-column parquet file. Failures are logged, not raised."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        pq.write_table(pa.table({'query': pa.array(queries, type=pa.string())}), cache_path)
+        logger.info("Cached %d queries to %s", len(queries), cache_path)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Failed to write query cache %s: %s", cache_path, e)
+
+
+def open_jsonl(path: str, mode: str = 'rb') -> BinaryIO:
+    """
+    Opens a JSONL file in binary mode ('rb' or 'wb'). Paths ending in '.gz' are
+    transparently gzip-compressed (at JSONL_GZIP_LEVEL when writing).
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, compresslevel=JSONL_GZIP_LEVEL)
+    return open(path, mode, buffering=JSONL_WRITE_BUFFER_SIZE)
+
+
+def dumps_jsonl(record: Dict) -> bytes:
+    """
+    Serializes a dictionary to UTF-8 encoded JSON (without trailing newline).
+    Uses orjson when available, otherwise the standard json module.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(record) # Always UTF-8, non-ASCII characters kept as-is
+    # ensure_ascii=False is important for non-English characters
+    return json.dumps(record, ensure_ascii=False).encode('utf-8')
+
+
+def loads_jsonl(line: bytes) -> Dict:
+    """Parses one JSONL line (orjson when available, otherwise the standard json module)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def save_jsonl_record(outfile: BinaryIO, record: Dict) -> bool:
     """
     Safely serializes a dictionary and writes it as a line to an open JSONL file handle.
 
     Args:
-        outfile: An open text file handle in write/append mode with UTF-8 encoding.
+        outfile: An open binary file handle in write/append mode.
         record: The dictionary to write.
 
     Returns:
         True if writing was successful, False otherwise.
     """
     try:
-        # ensure_ascii=False is important for non-English characters
-        json_line = json.dumps(record, ensure_ascii=False)
-        outfile.write(json_line + '\n')
+        outfile.write(dumps_jsonl(record) + b'\n')
         return True
     except Exception as e:
         # Log error but don't stop the entire process for one failed write
-        logging.error("Failed to serialize/write record for URL '%s': %s", record.get('url', 'N/A'), e)
+        logger.error("Failed to serialize/write record for URL '%s': %s", record.get('url', 'N/A'), e)
         return False
+
+
+def _encode_records(records: Iterable[Dict], fields: Optional[Sequence[str]] = None) -> Tuple[List[bytes], int]:
+    """
+    Serializes records to JSONL lines, keeping only `fields` (in that order) if given.
+    Returns the encoded lines and their count; records that fail to serialize are logged and skipped.
+    """
+    lines: List[bytes] = []
+    for record in records:
+        if fields is not None:
+            record = {key: record.get(key) for key in fields}
+        try:
+            lines.append(dumps_jsonl(record))
+        except (TypeError, ValueError) as e:
+            logger.error("Failed to serialize record for URL '%s': %s", record.get('url', 'N/A'), e)
+    return lines, len(lines)
+
+
+def save_jsonl_batch(path: str, records: Iterable[Dict], fields: Optional[Sequence[str]] = None) -> int:
+    """
+    Serializes records and writes them to a JSONL file (overwriting it) using a few large writes
+    instead of one write per record. Lines are flushed in chunks of about JSONL_WRITE_BUFFER_SIZE
+    bytes, so memory stays bounded for very large batches.
+
+    Args:
+        path: Path of the JSONL file to write ('.gz' suffix for gzip output).
+        records: The dictionaries to write, one per line.
+        fields: Optional keys to keep from each record (in this order); all keys if None.
+
+    Returns:
+        The number of records written. Records that fail to serialize are logged and skipped.
+
+    Raises:
+        OSError: If the file cannot be opened or written.
+    """
+    written = 0
+    chunk: List[bytes] = []
+    chunk_size = 0
+    with open_jsonl(path, 'wb') as outfile:
+        for record in records:
+            if fields is not None:
+                record = {key: record.get(key) for key in fields}
+            try:
+                json_line = dumps_jsonl(record)
+            except (TypeError, ValueError) as e:
+                logger.error("Failed to serialize record for URL '%s': %s", record.get('url', 'N/A'), e)
+                continue
+            chunk.append(json_line)
+            chunk_size += len(json_line) + 1
+            written += 1
+            if chunk_size >= JSONL_WRITE_BUFFER_SIZE:
+                outfile.write(b'\n'.join(chunk) + b'\n')
+                chunk = []
+                chunk_size = 0
+        if chunk:
+            outfile.write(b'\n'.join(chunk) + b'\n')
+    return written
+
+
+def project_jsonl(src_path: str, dst_path: str, fields: Sequence[str]) -> int:
+    """
+    Writes a JSONL file holding only `fields` of each record of another JSONL file,
+    in a single streaming pass.
+
+    Args:
+        src_path: JSONL file to read (gzip-compressed if it ends in '.gz').
+        dst_path: JSONL file to write (overwritten; gzip-compressed if it ends in '.gz').
+        fields: Keys to keep from each record, in this order.
+
+    Returns:
+        The number of records written. Malformed lines are logged and skipped.
+
+    Raises:
+        OSError: If either file cannot be opened, read or written.
+    """
+    def _records() -> Iterable[Dict]:
+        with open_jsonl(src_path, 'rb') as infile:
+            for line_number, line in enumerate(infile, start=1):
+                try:
+                    yield loads_jsonl(line)
+                except ValueError as e:
+                    logger.error("Skipping malformed line %d in %s: %s", line_number, src_path, e)
+
+    return save_jsonl_batch(dst_path, _records(), fields)
+
+
+class BackgroundJsonlWriter:
+    """
+    Streams records to JSONL files on a dedicated daemon thread fed by a queue, so the
+    caller never blocks on disk I/O. Files are opened and closed explicitly (e.g. once
+    per batch); records queued for the same file are written together in one write.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._lines_written: Dict[str, int] = {}
+        # Writer-thread state: path -> (file handle or None if opening failed, label, fields)
+        self._files: Dict[str, Tuple[Optional[BinaryIO], str, Optional[Sequence[str]]]] = {}
+        self._thread = threading.Thread(target=self._drain, name="jsonl-writer", daemon=True)
+        self._thread.start()
+
+    def open_file(self, path: str, label: str, fields: Optional[Sequence[str]] = None) -> None:
+        """
+        Queues opening `path` (overwritten) for subsequent write() calls.
+
+        Args:
+            path: Path of the JSONL file to write ('.gz' suffix for gzip output).
+            label: Name under which successfully written lines are counted (e.g. 'raw').
+            fields: Optional keys to keep from each record; see save_jsonl_batch.
+        """
+        self._queue.put(('open', path, label, fields))
+
+    def write(self, path: str, record: Dict) -> None:
+        """
+        Queues a record to be written to `path`, which must have been opened with open_file().
+        The caller must not modify the record afterwards.
+        """
+        self._queue.put(('write', path, record))
+
+    def close_file(self, path: str) -> None:
+        """Queues flushing and closing `path` after all records queued before this call."""
+        self._queue.put(('close', path))
+
+    def project_file(self, src_path: str, dst_path: str, label: str, fields: Sequence[str]) -> None:
+        """
+        Queues writing `dst_path` as a projection of `src_path` (see project_jsonl).
+        Call after close_file(src_path) so the source is complete.
+        """
+        self._queue.put(('project', src_path, dst_path, label, fields))
+
+    def _flush(self, path: str, records: List[Dict]) -> None:
+        """Writer thread: serializes pending records for one file and writes them at once."""
+        handle, label, fields = self._files.get(path, (None, None, None))
+        if handle is None:
+            logger.error("Dropping %d records for %s: file is not open.", len(records), path)
+            return
+        lines, count = _encode_records(records, fields)
+        if not count:
+            return
+        try:
+            handle.write(b'\n'.join(lines) + b'\n')
+        except OSError as e:
+            logger.error("Failed to write batch file %s: %s", path, e)
+            return
+        with self._lock:
+            self._lines_written[label] = self._lines_written.get(label, 0) + count
+
+    def _open(self, path: str, label: str, fields: Optional[Sequence[str]]) -> None:
+        """Writer thread: opens a batch file."""
+        try:
+            handle = open_jsonl(path, 'wb')
+        except OSError as e:
+            logger.error("Failed to open batch file %s: %s", path, e)
+            handle = None
+        self._files[path] = (handle, label, fields)
+
+    def _close(self, path: str) -> None:
+        """Writer thread: flushes and closes a batch file."""
+        handle, _, _ = self._files.pop(path, (None, None, None))
+        if handle is None:
+            return
+        try:
+            handle.close()
+        except OSError as e:
+            logger.error("Failed to close batch file %s: %s", path, e)
+
+    def _project(self, src_path: str, dst_path: str, label: str, fields: Sequence[str]) -> None:
+        """Writer thread: writes a projection of a finished batch file."""
+        try:
+            count = project_jsonl(src_path, dst_path, fields)
+        except OSError as e:
+            logger.error("Failed to project %s -> %s: %s", src_path, dst_path, e)
+            return
+        with self._lock:
+            self._lines_written[label] = self._lines_written.get(label, 0) + count
+
+    def _drain(self) -> None:
+        """Writer thread loop: processes queued operations until the None sentinel arrives."""
+        running = True
+        while running:
+            # Take everything queued so far, so records for the same file go out in one write
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            pending: Dict[str, List[Dict]] = {}
+            for item in items:
+                if item is None:
+                    running = False
+                    break
+                operation, path = item[0], item[1]
+                if operation == 'write':
+                    pending.setdefault(path, []).append(item[2])
+                    continue
+                # Keep per-file ordering: flush what is pending before any other operation
+                if path in pending:
+                    self._flush(path, pending.pop(path))
+                if operation == 'open':
+                    self._open(path, item[2], item[3])
+                elif operation == 'close':
+                    self._close(path)
+                else:
+                    self._project(path, item[2], item[3], item[4])
+
+            for path, records in pending.items():
+                self._flush(path, records)
+
+        for path in list(self._files):
+            self._close(path)
+
+    def lines_written(self, label: str) -> int:
+        """Returns the number of lines written so far under `label`."""
+        with self._lock:
+            return self._lines_written.get(label, 0)
+
+    def close(self) -> None:
+        """Waits for all queued records to be written, closes open files and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
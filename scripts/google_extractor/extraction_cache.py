@@ -0,0 +1,169 @@
+# extraction_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+URL normalization and a process-wide cache of text extraction results.
+Concurrent requests for the same URL share a single fetch, and successful
+extractions can be persisted to a JSONL sidecar file so re-runs skip them.
+The sidecar is compacted on load (expired and superseded records are dropped)
+and written through a BackgroundJsonlWriter, off the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import EXTRACTION_CACHE_TTL
+from data_handler import BackgroundJsonlWriter, loads_jsonl
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the referrer and never change the page content
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for use as a cache key: lowercases scheme and host,
+    drops tracking query parameters and the fragment.
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class ExtractionCache:
+    """
+    Caches extracted text per normalized URL.
+
+    Each URL maps to a future holding its extraction result; callers that ask for
+    a URL already being fetched await the existing future instead of fetching again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = EXTRACTION_CACHE_TTL,
+        writer: Optional[BackgroundJsonlWriter] = None
+    ):
+        """
+        Args:
+            path: Optional JSONL sidecar file. Existing records are loaded on creation,
+                the file is rewritten with only the live ones, and new successful
+                extractions are added to it.
+            ttl: Seconds a persisted record stays valid; older records are ignored
+                on load so their URLs are fetched again.
+            writer: Writer thread used for the sidecar file. If None, the cache starts
+                its own when a path is given (and stops it in close()).
+        """
+        self._path = path
+        self._ttl = ttl
+        self._persisted: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._writer: Optional[BackgroundJsonlWriter] = None
+        self._owns_writer = False
+        self.hits = 0
+        if path:
+            live_records = self._load(path)
+            self._writer = writer or BackgroundJsonlWriter()
+            self._owns_writer = writer is None
+            self._compact(path, live_records)
+
+    def _load(self, path: str) -> Dict[str, Dict]:
+        """
+        Loads previously persisted extraction results from the sidecar file, skipping
+        expired ones. Records without a 'fetched_at' timestamp count as malformed.
+
+        Returns:
+            The live records by URL (the last record of a URL wins).
+        """
+        live_records: Dict[str, Dict] = {}
+        if not os.path.exists(path):
+            return live_records
+        oldest_valid = time.time() - self._ttl
+        expired = 0
+        try:
+            with open(path, 'rb') as infile:
+                for line in infile:
+                    try:
+                        record = loads_jsonl(line)
+                        if record['fetched_at'] < oldest_valid:
+                            expired += 1
+                            continue
+                        self._persisted[record['url']] = record['extracted_text']
+                        live_records[record['url']] = record
+                    except (ValueError, KeyError, TypeError):
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Skipping malformed line in extraction cache %s", path)
+            logger.info("Loaded %d cached extractions from %s (%d expired records ignored)", len(self._persisted), path, expired)
+        except OSError as e:
+            logger.error("Failed to read extraction cache %s: %s", path, e)
+        return live_records
+
+    def _compact(self, path: str, live_records: Dict[str, Dict]) -> None:
+        """Queues rewriting the sidecar file with only the live records; new ones follow them."""
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        except OSError as e:
+            logger.error("Failed to create directory for extraction cache %s: %s. Disabling persistence.", path, e)
+            self._path = None
+            return
+        self._writer.open_file(path, "extraction_cache")
+        for record in live_records.values():
+            self._writer.write(path, record)
+
+    def _persist(self, key: str, text: str) -> None:
+        """Queues a successful extraction for the sidecar file (if configured)."""
+        if self._path:
+            self._writer.write(self._path, {'url': key, 'extracted_text': text, 'fetched_at': time.time()})
+
+    async def get_or_extract(
+        self,
+        url: str,
+        extract: Callable[[str], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Returns the cached extraction for `url`, awaiting an in-flight fetch of the
+        same URL if there is one, or runs `extract(url)` and caches its result.
+        """
+        key = normalize_url(url)
+        if key in self._persisted:
+            self.hits += 1
+            return self._persisted[key]
+
+        # No await between the lookup and the insert, so this is atomic on the event loop
+        future = self._inflight.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await extract(url)
+        except BaseException:
+            # Let waiters fall back to "no text" and allow a later retry of this URL
+            future.set_result(None)
+            del self._inflight[key]
+            raise
+
+        future.set_result(text)
+        if text is not None:
+            self._persist(key, text)
+        return text
+
+    def close(self) -> None:
+        """Queues closing the sidecar file, if it was opened (and stops the cache's own writer)."""
+        if self._writer is None:
+            return
+        if self._path:
+            self._writer.close_file(self._path)
+        if self._owns_writer:
+            self._writer.close()
+        self._writer = None
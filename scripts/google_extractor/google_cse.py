@@ -5,14 +5,23 @@
 Functions for interacting with the Google Custom Search Engine (CSE) API.
 """
 
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
 
+import aiohttp
 import requests
 
 # Import constants from config module
-from config import GOOGLE_API_URL, CSE_API_TIMEOUT
+from config import GOOGLE_API_URL, CSE_API_TIMEOUT, CSE_DEDUP_TTL, SKIPPED_URL_SUFFIXES, SKIPPED_HOSTS
+from http_session import build_pooled_session
+
+logger = logging.getLogger(__name__)
+
+# Reused for the process lifetime so the TLS connection to the API is kept alive
+_SESSION = build_pooled_session()
 
 def search_google_cse(
     query: str,
@@ -28,7 +37,7 @@ def search_google_cse(
     """
     # Basic validation handled in config, but check args passed specifically here if needed
     if not api_key or not cse_id:
-        logging.error("API Key or CSE ID missing in call to search_google_cse.")
+        logger.error("API Key or CSE ID missing in call to search_google_cse.")
         # Or raise ValueError - depends on desired handling in caller
         return None
 
@@ -38,37 +47,166 @@ def search_google_cse(
         'key': api_key, 'cx': cse_id, 'q': query,
         'num': num_results, 'start': start_index, **kwargs
     }
-    logging.info("Sending request to Google CSE API for query: '%s' (start: %d, num: %d)",
-                 query, start_index, num_results)
+    logger.info("Sending request to Google CSE API for query: '%s' (start: %d, num: %d)",
+                query, start_index, num_results)
 
     try:
-        response = requests.get(GOOGLE_API_URL, params=params, timeout=CSE_API_TIMEOUT)
+        response = _SESSION.get(GOOGLE_API_URL, params=params, timeout=CSE_API_TIMEOUT)
         response.raise_for_status() # Check for 4xx/5xx errors
         results = response.json()
         # Check for API-level errors within the JSON response
         if 'error' in results:
             error_details = results['error']
-            logging.error("Google API Error: Code %s - %s",
-                          error_details.get('code'), error_details.get('message'))
+            logger.error("Google API Error: Code %s - %s",
+                         error_details.get('code'), error_details.get('message'))
             return None # Return None to indicate API error, distinct from network error
         return results
     except requests.exceptions.Timeout:
-        logging.error("Google CSE API Request timed out for query: %s", query)
+        logger.error("Google CSE API Request timed out for query: %s", query)
         return None # Indicate timeout
     except requests.exceptions.RequestException as e:
-        logging.error("Network error during CSE API request for query '%s': %s", query, e)
+        logger.error("Network error during CSE API request for query '%s': %s", query, e)
         raise # Re-raise network errors to be handled by the caller (main_script)
     except json.JSONDecodeError:
-        logging.error("Failed to decode JSON response from CSE API for query: %s", query)
+        logger.error("Failed to decode JSON response from CSE API for query: %s", query)
         return None # Indicate bad response format
 
+async def search_google_cse_async(
+    session: aiohttp.ClientSession,
+    query: str,
+    api_key: str,
+    cse_id: str,
+    num_results: int,
+    start_index: int = 1,
+    **kwargs: Any
+) -> Optional[Dict[str, Any]]:
+    """
+    Async version of search_google_cse using a shared aiohttp session.
+    Returns None on API errors, timeouts and bad responses; re-raises network errors.
+    """
+    if not api_key or not cse_id:
+        logger.error("API Key or CSE ID missing in call to search_google_cse_async.")
+        return None
+
+    params = {
+        'key': api_key, 'cx': cse_id, 'q': query,
+        'num': num_results, 'start': start_index, **kwargs
+    }
+    logger.info("Sending request to Google CSE API for query: '%s' (start: %d, num: %d)",
+                query, start_index, num_results)
+
+    try:
+        async with session.get(
+            GOOGLE_API_URL, params=params, timeout=aiohttp.ClientTimeout(total=CSE_API_TIMEOUT)
+        ) as response:
+            response.raise_for_status() # Check for 4xx/5xx errors
+            results = await response.json(content_type=None)
+        # Check for API-level errors within the JSON response
+        if 'error' in results:
+            error_details = results['error']
+            logger.error("Google API Error: Code %s - %s",
+                         error_details.get('code'), error_details.get('message'))
+            return None # Return None to indicate API error, distinct from network error
+        return results
+    except asyncio.TimeoutError:
+        logger.error("Google CSE API Request timed out for query: %s", query)
+        return None # Indicate timeout
+    except aiohttp.ClientResponseError as e:
+        # HTTP errors (e.g. 429/5xx) go to the caller, which retries the transient ones and logs them
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("CSE API returned HTTP %d for query '%s'", e.status, query)
+        raise
+    except aiohttp.ClientError as e:
+        logger.error("Network error during CSE API request for query '%s': %s", query, e)
+        raise # Re-raise network errors to be handled by the caller (main_script)
+    except json.JSONDecodeError:
+        logger.error("Failed to decode JSON response from CSE API for query: %s", query)
+        return None # Indicate bad response format
+
+def cse_request_key(query: str, start_index: int, num_results: int, **kwargs: Any) -> Tuple:
+    """
+    Builds the deduplication key of a CSE request. The query is case-folded, whitespace is
+    collapsed and trailing punctuation dropped, since the search engine ignores those anyway.
+    """
+    normalized_query = " ".join(query.casefold().split()).rstrip(".?!")
+    return (normalized_query, start_index, num_results, tuple(sorted(kwargs.items())))
+
+
+class CseRequestDeduplicator:
+    """
+    Collapses identical CSE requests into a single API call: a request whose key is
+    already in flight (or completed within the TTL) awaits the first caller's result.
+    Failed or empty (None) responses are not reused.
+    """
+
+    def __init__(self, ttl: float = CSE_DEDUP_TTL):
+        self._ttl = ttl
+        self._entries: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+
+    def _expire(self, key: Tuple, future: asyncio.Future) -> None:
+        """Drops a cached response once its TTL has passed (unless it was replaced)."""
+        if self._entries.get(key) is future:
+            del self._entries[key]
+
+    async def get_or_fetch(
+        self,
+        key: Tuple,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the response for `key`, calling `fetch()` only if no reusable one exists."""
+        future = self._entries.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._entries[key] = future
+        try:
+            results = await fetch()
+        except BaseException as e:
+            del self._entries[key]
+            if isinstance(e, Exception):
+                future.set_exception(e) # Waiting duplicates see the same error
+                future.exception() # Mark as retrieved when nobody is waiting
+            else:
+                future.cancel()
+            raise
+
+        future.set_result(results)
+        if results is None:
+            del self._entries[key]
+        else:
+            loop.call_later(self._ttl, self._expire, key, future)
+        return results
+
+
+def _is_skipped_host(host: str) -> bool:
+    """True if `host` or one of its parent domains is in SKIPPED_HOSTS (m.facebook.com -> facebook.com)."""
+    labels = host.split('.')
+    return any('.'.join(labels[i:]) in SKIPPED_HOSTS for i in range(len(labels)))
+
+
+def _skip_reason(link: str) -> Optional[str]:
+    """Returns why a result link should not be extracted, or None if it should be kept."""
+    parts = urlsplit(link)
+    if parts.path.lower().endswith(SKIPPED_URL_SUFFIXES):
+        return "non-HTML document"
+    if _is_skipped_host((parts.hostname or '').rstrip('.')):
+        return "unsupported host"
+    return None
+
+
 def process_search_results(results_json: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
     """
     Extracts key information (title, link, snippet) from the CSE API response.
-    Filters for valid links.
+    Filters for valid links, dropping documents and hosts that extraction cannot handle
+    (see SKIPPED_URL_SUFFIXES and SKIPPED_HOSTS in config).
     """
     if not results_json or 'items' not in results_json:
-        logging.debug("No search results items found in CSE API response or response is invalid.")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No search results items found in CSE API response or response is invalid.")
         return []
 
     processed = []
@@ -76,11 +214,15 @@ def process_search_results(results_json: Optional[Dict[str, Any]]) -> List[Dict[
         link = item.get('link')
         # Ensure link exists and looks like a standard URL
         if link and link.startswith(('http://', 'https://')):
+            reason = _skip_reason(link)
+            if reason:
+                logger.warning("Skipping result %s: %s", link, reason)
+                continue
             processed.append({
             'title': item.get('title', 'N/A'),
             'link': link,
             'snippet': item.get('snippet', 'N/A')
             })
         else:
-            logging.warning("Skipping result with invalid/missing link: Title '%s'", item.get('title', 'N/A'))
+            logger.warning("Skipping result with invalid/missing link: Title '%s'", item.get('title', 'N/A'))
     return processed
@@ -0,0 +1,67 @@
+# http_session.py
+# -*- coding: utf-8 -*-
+
+"""
+Factories for pooled HTTP clients: requests sessions shared by the synchronous
+helpers and the aiohttp connector used by the async fetchers.
+"""
+
+import atexit
+from typing import Collection, Mapping, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_POOL_SIZE, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF, HTTP_RETRY_STATUSES,
+    CONNECTOR_LIMIT, CONNECTOR_LIMIT_PER_HOST, CONNECTOR_DNS_CACHE_TTL, CONNECTOR_KEEPALIVE_TIMEOUT
+)
+
+
+def build_pooled_session(
+    pool_size: int = HTTP_POOL_SIZE,
+    max_retries: int = HTTP_MAX_RETRIES,
+    backoff_factor: float = HTTP_RETRY_BACKOFF,
+    retry_statuses: Collection[int] = HTTP_RETRY_STATUSES,
+    headers: Optional[Mapping[str, str]] = None
+) -> requests.Session:
+    """
+    Creates a requests.Session with a connection pool and retry policy mounted
+    for both http:// and https://, so TCP/TLS connections are reused across calls.
+    The session is closed automatically at interpreter exit.
+
+    Args:
+        pool_size: Number of host pools cached and connections kept per host.
+        max_retries: Retries on connection/read errors and on `retry_statuses`.
+        backoff_factor: Backoff factor between retries (seconds).
+        retry_statuses: HTTP statuses that are retried.
+        headers: Optional default headers sent with every request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=retry_statuses)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    atexit.register(session.close)
+    return session
+
+
+def build_connector() -> aiohttp.TCPConnector:
+    """
+    Creates the aiohttp connector used for async fetching: a bounded, keep-alive
+    connection pool with a per-host limit and DNS caching.
+    Must be called while an event loop is running.
+    """
+    return aiohttp.TCPConnector(
+        limit=CONNECTOR_LIMIT,
+        limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+        ttl_dns_cache=CONNECTOR_DNS_CACHE_TTL,
+        keepalive_timeout=CONNECTOR_KEEPALIVE_TIMEOUT
+    )
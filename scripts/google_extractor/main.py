@@ -5,24 +5,34 @@
 Main script to orchestrate the process:
 1. Read queries from a dataset.
 2. Process queries in batches: For each query, perform Google Search & extract text.
-3. After each batch completes, save its raw results and extracted results
-   into separate files within automatically created directories.
+3. Stream each batch's records (search result plus extracted text) into one
+   combined JSONL file (gzip-compressed unless --no-gzip) as they complete,
+   within an automatically created directory. Optionally, once a batch is done,
+   write a raw search-results file projected from it (--raw-output-base).
 """
 
 import argparse
+import asyncio
+import functools
 import logging
 import time
 import math
 import os
-from typing import Dict, List, Generator, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Generator, Any, Optional, Tuple
 
-import requests
+import aiohttp
+from aiolimiter import AsyncLimiter
 from tqdm import tqdm
 
 import config
-from google_cse import search_google_cse, process_search_results
-from text_extractor import extract_main_text_requests
-from data_handler import read_queries_from_vifactcheck, save_jsonl_record
+from google_cse import (
+    search_google_cse_async, process_search_results, cse_request_key, CseRequestDeduplicator
+)
+from text_extractor import extract_main_text_aiohttp, get_parse_pool, shutdown_parse_pool
+from data_handler import read_queries_from_vifactcheck, BackgroundJsonlWriter
+from extraction_cache import ExtractionCache, normalize_url
+from http_session import build_connector
 
 
 logging.basicConfig(
@@ -30,6 +40,11 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - [%(module)s] - %(message)s'
 )
 
+logger = logging.getLogger(__name__)
+
+# Fields of the optional raw search files, a projection of the combined batch records
+_RAW_KEYS = ('query', 'search_page', 'approx_rank', 'url', 'title', 'snippet')
+
 
 def parse_arguments() -> argparse.Namespace:
     """Parses command-line arguments."""
@@ -43,24 +58,45 @@ def parse_arguments() -> argparse.Namespace:
     # Search & Extraction Params
     parser.add_argument("-p", "--pages", type=int, default=1, help="N of Google Search result pages per query.")
     parser.add_argument("-n", "--num-results", type=int, default=config.DEFAULT_CSE_NUM_RESULTS, help="Results per CSE page (1-10).")
-    parser.add_argument("-d", "--delay", type=float, default=config.DEFAULT_REQUEST_DELAY, help="Delay between CSE API requests (secs).")
+    parser.add_argument("-r", "--cse-rate", type=float, default=config.DEFAULT_CSE_RATE, help="Max CSE API requests per second.")
     parser.add_argument("-t", "--timeout", type=int, default=config.DEFAULT_EXTRACTION_TIMEOUT, help="Timeout for URL text extraction (secs).")
+    parser.add_argument("--max-connections", type=int, default=config.DEFAULT_MAX_CONNECTIONS, help="Max concurrent URL extractions.")
+    parser.add_argument("--workers", type=int, default=config.DEFAULT_EXECUTOR_WORKERS, help="Threads for blocking work (DNS lookups, HTML parsing without --parse-processes).")
+    parser.add_argument("--parse-processes", type=int, default=config.DEFAULT_PARSE_PROCESSES, help="Worker processes for HTML parsing (0 parses in the thread pool).")
     parser.add_argument("--site-search", type=str, default=None, help="Restrict search to a specific site.")
     parser.add_argument("--batch-size", type=int, default=10, help="N of queries to process between progress updates.")
+    parser.add_argument("--extraction-cache", type=str, default=config.DEFAULT_EXTRACTION_CACHE_PATH, help="JSONL file caching extracted text per URL across runs (empty string disables persistence).")
     
     # Output Base Paths (used to determine directory and file naming)
-    parser.add_argument("--search-output-base", type=str, default=config.DEFAULT_SEARCH_OUTPUT_BASE, help="Base path and prefix for raw search batch files (e.g., 'out/raw' -> out/raw_batches/raw_1.jsonl).")
-    parser.add_argument("--extracted-output-base", type=str, default=config.DEFAULT_EXTRACTED_OUTPUT_BASE, help="Base path and prefix for extracted text batch files (e.g., 'out/text' -> out/text_batches/text_1.jsonl).")
+    parser.add_argument("--output-base", type=str, default=config.DEFAULT_OUTPUT_BASE, help="Base path and prefix for combined batch files with search results and extracted text (e.g., 'out/combined' -> out/combined_batches/combined_1.jsonl.gz).")
+    parser.add_argument("--raw-output-base", type=str, default=None, help="If set, also write raw search batch files (no extracted text) with this base path and prefix (e.g., 'out/raw' -> out/raw_batches/raw_1.jsonl.gz).")
+    parser.add_argument("--no-gzip", action="store_true", help="Write plain .jsonl batch files instead of gzip-compressed .jsonl.gz.")
 
     args = parser.parse_args()
     # Validate num_results
     if not 1 <= args.num_results <= 10:
-        logging.warning("Num results (%d) out of range (1-10). Setting to 10.", args.num_results)
+        logger.warning("Num results (%d) out of range (1-10). Setting to 10.", args.num_results)
         args.num_results = 10
     # Validate batch_size
     if args.batch_size <= 0:
-        logging.warning("Batch size (%d) must be positive. Setting to 1.", args.batch_size)
+        logger.warning("Batch size (%d) must be positive. Setting to 1.", args.batch_size)
         args.batch_size = 1
+    # Validate cse_rate
+    if args.cse_rate <= 0:
+        logger.warning("CSE rate (%.2f) must be positive. Setting to %.2f.", args.cse_rate, config.DEFAULT_CSE_RATE)
+        args.cse_rate = config.DEFAULT_CSE_RATE
+    # Validate max_connections
+    if args.max_connections <= 0:
+        logger.warning("Max connections (%d) must be positive. Setting to 1.", args.max_connections)
+        args.max_connections = 1
+    # Validate workers
+    if args.workers <= 0:
+        logger.warning("Workers (%d) must be positive. Setting to 1.", args.workers)
+        args.workers = 1
+    # Validate parse_processes
+    if args.parse_processes < 0:
+        logger.warning("Parse processes (%d) must not be negative. Setting to 0.", args.parse_processes)
+        args.parse_processes = 0
     return args
 
 
@@ -71,226 +107,347 @@ def batch_generator(data: List[Any], batch_size: int) -> Generator[List[Any], No
         yield data[i:i + batch_size]
 
 
-def _process_single_query(
+def _prepare_batch_dir(base_path: str) -> Tuple[str, str]:
+    """
+    Creates the batch directory for an output base path ('out/raw' -> 'out/raw_batches').
+    Returns the directory and the file name prefix; raises OSError on failure.
+    """
+    output_dir = os.path.dirname(base_path) or '.' # Use current dir if no path specified
+    base_name = os.path.basename(base_path)
+    batch_dir = os.path.join(output_dir, f"{base_name}_batches")
+    os.makedirs(batch_dir, exist_ok=True)
+    return batch_dir, base_name
+
+
+def _batch_path_template(batch_dir: str, base_name: str, suffix: str) -> str:
+    """Returns a str.format template for batch file paths ('dir/name_{}.jsonl'); braces in the path are escaped."""
+    prefix = os.path.join(batch_dir, base_name).replace('{', '{{').replace('}', '}}')
+    return prefix + "_{}" + suffix
+
+
+async def _search_page(
+    limiter: AsyncLimiter,
+    deduplicator: CseRequestDeduplicator,
+    do_search: Callable[..., Awaitable[Optional[Dict[str, Any]]]],
+    request_key: Callable[..., Tuple],
     query: str,
-    args: argparse.Namespace
+    start_index: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches one page of CSE results once the shared rate limiter grants a slot.
+    Requests identical to one already sent reuse its response without using quota.
+    Rate limiting (429) and server errors (5xx) are retried up to HTTP_MAX_RETRIES times
+    with exponential backoff, each attempt taking a new limiter slot.
+
+    Args:
+        limiter: Shared CSE rate limiter.
+        deduplicator: Shared CSE request deduplicator.
+        do_search: search_google_cse_async with the per-run arguments already bound;
+            called as do_search(query=..., start_index=...).
+        request_key: cse_request_key with the same per-run arguments bound.
+        query: The search query string.
+        start_index: Index of the first result of the page (1-based).
+    """
+    async def _fetch() -> Optional[Dict[str, Any]]:
+        for attempt in range(config.HTTP_MAX_RETRIES + 1):
+            try:
+                async with limiter:
+                    return await do_search(query=query, start_index=start_index)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in config.HTTP_RETRY_STATUSES or attempt == config.HTTP_MAX_RETRIES:
+                    raise
+                delay = config.HTTP_RETRY_BACKOFF * 2 ** attempt
+                logger.warning("CSE API returned HTTP %d for query '%s' (start: %d). Retrying in %.1f seconds.",
+                               e.status, query, start_index, delay)
+                await asyncio.sleep(delay)
+        return None # Not reached: the last attempt returns or raises
+
+    return await deduplicator.get_or_fetch(request_key(query, start_index), _fetch)
+
+
+async def _fetch_and_extract(
+    extract_url: Callable[[str], Awaitable[Optional[str]]],
+    semaphore: asyncio.Semaphore,
+    cache: ExtractionCache,
+    url: str
+) -> Optional[str]:
+    """
+    Extracts text from a single URL, reusing the cached result for duplicate URLs.
+    Cache misses wait for a free slot in the shared semaphore before fetching.
+    """
+    async def _extract(target_url: str) -> Optional[str]:
+        async with semaphore:
+            return await extract_url(target_url)
+
+    return await cache.get_or_extract(url, _extract)
+
+
+async def _process_single_query(
+    query: str,
+    page_results: List[Any],
+    args: argparse.Namespace,
+    extract_url: Callable[[str], Awaitable[Optional[str]]],
+    semaphore: asyncio.Semaphore,
+    cache: ExtractionCache,
+    emit_record: Callable[[Dict], None]
 ) -> Dict[str, int]:
     """
-    Processes all pages for a single search query. Fetches results, extracts text,
-    and returns counters and lists of results (does NOT write to files).
+    Processes all fetched pages for a single search query, then extracts text
+    from all result URLs concurrently. Each result record is handed to `emit_record`
+    as soon as its extraction completes.
 
     Args:
         query: The search query string.
+        page_results: CSE responses for this query in page order; each item is the
+            response JSON, None (API error) or the exception raised by the request.
         args: Parsed command-line arguments.
+        extract_url: extract_main_text_aiohttp with the shared session, timeout and
+            parse executor bound; called as extract_url(url).
+        semaphore: Shared semaphore bounding the number of extractions in flight.
+        cache: Shared extraction cache used to skip duplicate URLs.
+        emit_record: Callback receiving each completed record, holding both the search
+            result fields and the extracted text.
 
     Returns:
-        A tuple containing:
-        - counters: {"raw_saved": int, "urls_processed": int, "extractions_success": int}
-        - raw_results: List of raw search result dictionaries for this query.
-        - extracted_results: List of extracted text result dictionaries for this query.
+        Counters: {"raw_saved": int, "urls_processed": int, "extractions_success": int}
     """
     counters = {"raw_saved": 0, "urls_processed": 0, "extractions_success": 0}
-    raw_results_for_query: List[Dict] = []
-    extracted_results_for_query: List[Dict] = []
+    records_for_query: List[Dict] = []
+    seen_urls = set() # Normalized URLs already recorded for this query
     stop_fetching_pages = False
     query_short = (query[:35] + '...') if len(query) > 35 else query
 
-    # --- Loop through Search Pages ---
-    for page in range(args.pages):
+    # --- Loop through Search Pages (all pages were requested concurrently) ---
+    for page, results_json in enumerate(page_results):
         if stop_fetching_pages:
-            logging.debug("Stopping page fetching for query '%s' as requested.", query_short)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Discarding remaining pages for query '%s' as requested.", query_short)
             break
 
         start_index = page * args.num_results + 1
-        logging.debug("Fetching page %d (start index %d) for query '%s'", page + 1, start_index, query_short)
-
-        # --- Fetch Search Results ---
-        api_kwargs = {'siteSearch': args.site_search} if args.site_search else {}
-        try:
-            results_json = search_google_cse(
-                query=query, api_key=config.API_KEY, cse_id=config.CSE_ID,
-                num_results=args.num_results, start_index=start_index, **api_kwargs
-            )
-        except requests.exceptions.RequestException as e:
-            logging.error("Stopping processing for query '%s' due to CSE API network error: %s", query_short, e)
+
+        if isinstance(results_json, aiohttp.ClientError):
+            logger.error("Stopping processing for query '%s' due to CSE API network error: %s", query_short, results_json)
+            stop_fetching_pages = True
+            continue
+        if isinstance(results_json, BaseException):
+            logger.error("Unexpected error from CSE API for query '%s', page %d: %s", query_short, page + 1, results_json)
             stop_fetching_pages = True
             continue
 
         if results_json is None:
-            logging.warning("No results or error from CSE API for query '%s', page %d. Stopping page fetch.", query_short, page + 1)
+            logger.warning("No results or error from CSE API for query '%s', page %d. Stopping page fetch.", query_short, page + 1)
             stop_fetching_pages = True
             continue
 
         # --- Process & Save Raw Search Results ---
         search_results_list = process_search_results(results_json)
         if search_results_list:
-            logging.debug("Processing %d results from search page %d for query '%s'",
-                          len(search_results_list), page + 1, query_short)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing %d results from search page %d for query '%s'",
+                             len(search_results_list), page + 1, query_short)
 
             for result_index, search_item in enumerate(search_results_list):
                 current_rank = start_index + result_index
 
-                 # 1. Prepare Raw Result
-                search_item['query'] = query
-                search_item['search_page'] = page + 1
-                search_item['approx_rank'] = current_rank
-                raw_results_for_query.append(search_item.copy()) # Append a copy
-                counters["raw_saved"] += 1
-
-                # 2. Extract Text
-                target_url = search_item.get('link')
-                if not target_url:
-                    logging.debug("Skipping extraction for item rank %d (no link) for query '%s'", current_rank, query_short)
-                    # Still create an extracted record, but with null text
-                    extracted_content = None
-                else:
-                    counters["urls_processed"] += 1
-                    extracted_content = extract_main_text_requests(target_url, timeout=args.timeout)
-                    if extracted_content is not None:
-                        counters["extractions_success"] += 1
-                    else:
-                        logging.debug("Extraction failed or yielded no content for URL: %s", target_url)
-
-                # 3. Prepare Extracted Result
-                final_record = {
+                # Skip results pointing to a page already returned for this query
+                normalized_link = normalize_url(search_item['link'])
+                if normalized_link in seen_urls:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Skipping duplicate result %s (rank %d) for query '%s'", search_item['link'], current_rank, query_short)
+                    continue
+                seen_urls.add(normalized_link)
+
+                # Single record per result (text is filled in after the concurrent fetch)
+                records_for_query.append({
                     "query": query, "search_page": page + 1, "approx_rank": current_rank,
-                    "url": target_url, "title": search_item.get('title', 'N/A'),
-                    "extracted_text": extracted_content
-                }
-                extracted_results_for_query.append(final_record)
-
-            if len(search_results_list) < args.num_results:
-                logging.info("Received fewer results (%d) than requested (%d) for query '%s', page %d; stopping page fetch.",
-                             len(search_results_list), args.num_results, query_short, page + 1)
-                stop_fetching_pages = True
+                    "url": search_item.get('link'), "title": search_item.get('title', 'N/A'),
+                    "snippet": search_item.get('snippet', 'N/A'), "extracted_text": None
+                })
         else:
-            logging.info("No valid URLs found in results for query '%s', page %d. Stopping page fetch.", query_short, page + 1)
+            logger.info("No valid URLs found in results for query '%s', page %d.", query_short, page + 1)
+
+        # Compare against what the API returned, since filtered results do not mean the last page
+        returned_count = len(results_json.get('items') or [])
+        if returned_count < args.num_results:
+            logger.info("Received fewer results (%d) than requested (%d) for query '%s', page %d; stopping page fetch.",
+                        returned_count, args.num_results, query_short, page + 1)
             stop_fetching_pages = True
 
-    logging.info("Finished pages for query '%s'. Raw results saved: %d. URLs processed: %d (%d successful).", query_short, counters["raw_saved"], counters["urls_processed"], counters["extractions_success"])
-    return counters, raw_results_for_query, extracted_results_for_query
+    counters["raw_saved"] = len(records_for_query)
 
+    # --- Extract Text from all collected URLs concurrently, emitting each record when done ---
+    async def _complete_record(record: Dict) -> bool:
+        extracted_content = None
+        if not record["url"]:
+            # Still emit the record, but with null text
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Skipping extraction for item rank %d (no link) for query '%s'", record["approx_rank"], query_short)
+        else:
+            try:
+                extracted_content = await _fetch_and_extract(extract_url, semaphore, cache, record["url"])
+            except Exception as e:
+                logger.error("Unexpected error extracting URL %s: %s", record["url"], e)
+            if extracted_content is None:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Extraction failed or yielded no content for URL: %s", record["url"])
+        record["extracted_text"] = extracted_content
+        emit_record(record)
+        return extracted_content is not None
 
-def run_process(args: argparse.Namespace):
+    counters["urls_processed"] = sum(1 for record in records_for_query if record["url"])
+    outcomes = await asyncio.gather(*(_complete_record(record) for record in records_for_query))
+    counters["extractions_success"] = sum(outcomes)
+
+    logger.info("Finished pages for query '%s'. Raw results saved: %d. URLs processed: %d (%d successful).", query_short, counters["raw_saved"], counters["urls_processed"], counters["extractions_success"])
+    return counters
+
+
+async def run_process(args: argparse.Namespace):
     """Coordinates the fetching, extraction, and saving process."""
     try:
         config.validate_config()
-        logging.info("API Key and CSE ID loaded successfully.")
+        logger.info("API Key and CSE ID loaded successfully.")
     except ValueError as e:
-        logging.error("%s. Exiting.", e)
+        logger.error("%s. Exiting.", e)
         return
 
     queries = read_queries_from_vifactcheck(args.query_column)
     if queries is None: # Error reading file/column
-        logging.error("Failed to read queries. Exiting.")
+        logger.error("Failed to read queries. Exiting.")
         return
     if not queries: # File/column ok, but no queries found
-        logging.info("No queries to process. Exiting.")
+        logger.info("No queries to process. Exiting.")
         return
     
     # --- Prepare Output Directories ---
     try:
-        # Raw results directory
-        raw_base_path = args.search_output_base
-        raw_output_dir = os.path.dirname(raw_base_path) or '.' # Use current dir if no path specified
-        raw_base_name = os.path.basename(raw_base_path)
-        raw_batch_dir = os.path.join(raw_output_dir, f"{raw_base_name}_batches")
-        os.makedirs(raw_batch_dir, exist_ok=True)
-        logging.info("Raw search batch results -> %s/", raw_batch_dir)
-
-        # Extracted results directory
-        extracted_base_path = args.extracted_output_base
-        extracted_output_dir = os.path.dirname(extracted_base_path) or '.'
-        extracted_base_name = os.path.basename(extracted_base_path)
-        extracted_batch_dir = os.path.join(extracted_output_dir, f"{extracted_base_name}_batches")
-        os.makedirs(extracted_batch_dir, exist_ok=True)
-        logging.info("Extracted text batch results -> %s/", extracted_batch_dir)
+        # Combined results directory
+        combined_batch_dir, combined_base_name = _prepare_batch_dir(args.output_base)
+        logger.info("Combined batch results -> %s/", combined_batch_dir)
+
+        # Optional raw search results directory
+        raw_batch_dir = raw_base_name = None
+        if args.raw_output_base:
+            raw_batch_dir, raw_base_name = _prepare_batch_dir(args.raw_output_base)
+            logger.info("Raw search batch results -> %s/", raw_batch_dir)
 
     except OSError as e:
-        logging.error("Failed to create output directories: %s. Exiting.", e)
+        logger.error("Failed to create output directories: %s. Exiting.", e)
         return
 
+    # Batch file paths, formatted with the 1-based batch number
+    batch_suffix = ".jsonl" if args.no_gzip else ".jsonl.gz"
+    combined_batch_template = _batch_path_template(combined_batch_dir, combined_base_name, batch_suffix)
+    raw_batch_template = _batch_path_template(raw_batch_dir, raw_base_name, batch_suffix) if raw_batch_dir else None
+
     # --- Initialize Total Counters ---
     total_counters = {"raw_saved": 0, "urls_processed": 0, "extractions_success": 0}
-    actual_lines_written = {"raw": 0, "extracted": 0} # Track successful writes
     global_query_index = 0
 
+    # One connection pool and one concurrency limit shared by the whole run
+    connector = build_connector()
+    semaphore = asyncio.Semaphore(args.max_connections)
+    limiter = AsyncLimiter(args.cse_rate, 1)
+    deduplicator = CseRequestDeduplicator()
+    writer = BackgroundJsonlWriter()
+    cache = ExtractionCache(args.extraction_cache or None, writer=writer)
+
+    # Search arguments that are the same for every request of the run
+    api_kwargs = {'siteSearch': args.site_search} if args.site_search else {}
+    request_key = functools.partial(cse_request_key, num_results=args.num_results, **api_kwargs)
+
+    # Per-URL progress; the total is an upper bound (pages * results per query)
+    url_pbar = tqdm(
+        total=len(queries) * args.pages * args.num_results, desc="Extracting URLs", unit="url",
+        mininterval=config.PROGRESS_MININTERVAL, miniters=config.PROGRESS_URL_MINITERS,
+        smoothing=0, leave=False, dynamic_ncols=True
+    )
+
+    # One bounded thread pool for the whole run, used by run_in_executor(None, ...)
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="extract")
+    asyncio.get_running_loop().set_default_executor(executor)
+    # Optional process pool so HTML parsing is not serialized by the GIL.
+    parse_pool = None
+    if args.parse_processes > 0:
+        parse_pool = get_parse_pool(args.parse_processes)
+        logger.info("Parsing HTML in %d worker processes.", args.parse_processes)
+
     try:
-        # --- Setup Batch Processing ---
-        num_queries = len(queries)
-        batch_size = args.batch_size
-        num_batches = math.ceil(num_queries / batch_size)
-        query_batches = batch_generator(queries, batch_size)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            do_search = functools.partial(
+                search_google_cse_async, session, api_key=config.API_KEY, cse_id=config.CSE_ID,
+                num_results=args.num_results, **api_kwargs
+            )
+            extract_url = functools.partial(
+                extract_main_text_aiohttp, session, timeout=args.timeout, parse_executor=parse_pool
+            )
+
+            # --- Setup Batch Processing ---
+            num_queries = len(queries)
+            batch_size = args.batch_size
+            num_batches = math.ceil(num_queries / batch_size)
+            query_batches = batch_generator(queries, batch_size)
 
-        logging.info("Processing %d queries in %d batches of size %d.", num_queries, num_batches, batch_size)
+            logger.info("Processing %d queries in %d batches of size %d.", num_queries, num_batches, batch_size)
         
-        # --- Process Batches with Progress Bar ---
-        batch_iterator = tqdm(query_batches, total=num_batches, desc="Processing Batches", unit="batch")
-        for batch_index, query_batch in enumerate(batch_iterator):
-            batch_start_time = time.time()
-            batch_iterator.set_postfix_str(f"Batch {batch_index + 1}/{num_batches}")
-
-            # Lists to hold results for the current batch
-            current_batch_raw_results: List[Dict] = []
-            current_batch_extracted_results: List[Dict] = []
-
-            # --- Process Queries within the Current Batch ---
-            for query_in_batch_index, current_query in enumerate(query_batch):
-                # --- Apply Delay ---
-                if global_query_index > 0 and args.delay > 0:
-                    logging.debug("Waiting %.2f seconds before query %d (%d in batch)...", args.delay, global_query_index + 1, query_in_batch_index + 1)
-                    time.sleep(args.delay)
-
-                # --- Process this Query (returns counters and results) ---
-                query_counters, raw_res_list, extracted_res_list = _process_single_query(
-                    current_query, args
-                )
+            # --- Process Batches with Progress Bar ---
+            batch_iterator = tqdm(
+                query_batches, total=num_batches, desc="Processing Batches", unit="batch",
+                mininterval=config.PROGRESS_MININTERVAL, smoothing=0, dynamic_ncols=True
+            )
+            for batch_index, query_batch in enumerate(batch_iterator):
+                batch_start_time = time.time()
+
+                # Define the batch filename and open it on the writer thread
+                combined_batch_filename = combined_batch_template.format(batch_index + 1)
+                logger.info("Streaming batch %d results -> %s", batch_index + 1, combined_batch_filename)
+                writer.open_file(combined_batch_filename, "combined")
+
+                def emit_record(record: Dict) -> None:
+                    writer.write(combined_batch_filename, record)
+                    url_pbar.update(1) # Called on the event loop thread only
+
+                # --- Fetch all pages of all queries in the batch concurrently ---
+                search_tasks = [
+                    _search_page(limiter, deduplicator, do_search, request_key, current_query, page * args.num_results + 1)
+                    for current_query in query_batch for page in range(args.pages)
+                ]
+                search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
+
+                # --- Process Queries within the Current Batch (records are written as they complete) ---
+                query_outputs = await asyncio.gather(*(
+                    _process_single_query(
+                        current_query,
+                        search_results[query_in_batch_index * args.pages:(query_in_batch_index + 1) * args.pages],
+                        args, extract_url, semaphore, cache, emit_record
+                    )
+                    for query_in_batch_index, current_query in enumerate(query_batch)
+                ))
 
                 # --- Aggregate Counters ---
-                for key in total_counters:
-                    total_counters[key] += query_counters.get(key, 0)
-
-                # --- Collect Results for Batch ---
-                current_batch_raw_results.extend(raw_res_list)
-                current_batch_extracted_results.extend(extracted_res_list)
-                global_query_index += 1
-
-            # --- Batch Complete: Save Collected Results ---
-            batch_end_time = time.time()
-            logging.info("Batch %d completed processing %d queries in %.2f seconds.", batch_index + 1, len(query_batch), batch_end_time - batch_start_time)
-            
-            # Define batch filenames
-            raw_batch_filename = os.path.join(raw_batch_dir, f"{raw_base_name}_{batch_index + 1}.jsonl")
-            extracted_batch_filename = os.path.join(extracted_batch_dir, f"{extracted_base_name}_{batch_index + 1}.jsonl")
-
-            logging.info("Saving batch %d results: Raw -> %s, Extracted -> %s", batch_index + 1, raw_batch_filename, extracted_batch_filename)
-
-            # Save Raw Results for the batch
-            raw_saved_count = 0
-            try:
-                with open(raw_batch_filename, 'w', encoding='utf-8') as batch_raw_outfile:
-                    for record in current_batch_raw_results:
-                        if save_jsonl_record(batch_raw_outfile, record):
-                            raw_saved_count += 1
-                actual_lines_written["raw"] += raw_saved_count
-            except IOError as e:
-                logging.error("Failed to open/write raw batch file %s: %s", raw_batch_filename, e)
-            
-            # Save Extracted Results for the batch
-            extracted_saved_count = 0
-            try:
-                with open(extracted_batch_filename, 'w', encoding='utf-8') as batch_extracted_outfile:
-                    for record in current_batch_extracted_results:
-                         if save_jsonl_record(batch_extracted_outfile, record):
-                            extracted_saved_count += 1
-                actual_lines_written["extracted"] += extracted_saved_count
-            except IOError as e:
-                logging.error("Failed to open/write extracted batch file %s: %s", extracted_batch_filename, e)
-
-            logging.info("Finished saving for batch %d. Raw saved: %.2f, Extracted saved: %.2f", batch_index + 1, raw_saved_count/len(current_batch_raw_results), extracted_saved_count/len(current_batch_extracted_results))
+                for query_counters in query_outputs:
+                    for key in total_counters:
+                        total_counters[key] += query_counters.get(key, 0)
+                    global_query_index += 1
+
+                # --- Batch Complete: Close its file (flushed by the writer thread) ---
+                writer.close_file(combined_batch_filename)
+                if raw_batch_template:
+                    # Raw file is a projection of the finished combined file
+                    raw_batch_filename = raw_batch_template.format(batch_index + 1)
+                    writer.project_file(combined_batch_filename, raw_batch_filename, "raw", _RAW_KEYS)
+                batch_end_time = time.time()
+                logger.info("Batch %d completed processing %d queries in %.2f seconds.", batch_index + 1, len(query_batch), batch_end_time - batch_start_time)
 
     except Exception as e:
-        logging.error("An unexpected fatal error occurred during main execution: %s", e, exc_info=True)
+        logger.error("An unexpected fatal error occurred during main execution: %s", e, exc_info=True)
+    finally:
+        url_pbar.close()
+        cache.close()
+        writer.close() # Wait for queued records to be flushed before reporting
+        executor.shutdown(wait=True)
+        shutdown_parse_pool()
 
     # --- Final Summary ---
     print("\n--- Processing Summary ---")
@@ -301,15 +458,26 @@ def run_process(args: argparse.Namespace):
     print(f"Total raw search results generated: {total_counters['raw_saved']}")
     print(f"Total URLs processed for extraction: {total_counters['urls_processed']}")
     print(f"Total successful text extractions: {total_counters['extractions_success']}")
+    print(f"URLs served from extraction cache: {cache.hits}")
+    print(f"CSE requests served by an identical earlier request: {deduplicator.hits}")
     # Report actual lines written across all batches
-    print(f"Total raw result lines successfully written to batch files: {actual_lines_written['raw']}")
-    print(f"Total extracted text lines successfully written to batch files: {actual_lines_written['extracted']}")
-    print(f"Raw search batch files saved in: {raw_batch_dir}/")
-    print(f"Extracted text batch files saved in: {extracted_batch_dir}/")
+    print(f"Total combined result lines successfully written to batch files: {writer.lines_written('combined')}")
+    print(f"Combined batch files saved in: {combined_batch_dir}/")
+    if raw_batch_dir:
+        print(f"Total raw result lines successfully written to batch files: {writer.lines_written('raw')}")
+        print(f"Raw search batch files saved in: {raw_batch_dir}/")
     print("------------------------\n")
 
 
 if __name__ == "__main__":
     args = parse_arguments()
-    run_process(args)
-    logging.info("Script finished.")
+    # Use the libuv-based event loop where available (not supported on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Using uvloop event loop.")
+    except ImportError:
+        pass
+    asyncio.run(run_process(args))
+    logger.info("Script finished.")
@@ -0,0 +1,83 @@
+# start_browser_server.py
+# -*- coding: utf-8 -*-
+
+"""
+Starts one headless Chromium with remote debugging enabled, to be shared by several
+extractor processes instead of each launching its own browser.
+
+Usage:
+    python start_browser_server.py --port 9222
+
+Then set PLAYWRIGHT_CDP_URL=http://127.0.0.1:9222 (in the environment or .env) for the
+processes rendering pages with text_extractor.extract_main_text_playwright or
+extract_many(..., use_playwright=True), e.g.:
+    PLAYWRIGHT_CDP_URL=http://127.0.0.1:9222 python -c "import asyncio, text_extractor; \
+        print(asyncio.run(text_extractor.extract_many(['https://example.com'], use_playwright=True)))"
+(main.py fetches pages over plain HTTP and does not use the browser.)
+
+Every worker connects with connect_over_cdp and renders pages in its own browser
+context, so pages stay isolated while only one Chromium is running.
+The browser runs until this script is interrupted (Ctrl+C). It is sandboxed unless
+PLAYWRIGHT_NO_SANDBOX=1 is set, which is only meant for containers where the sandbox cannot start.
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import tempfile
+
+from playwright.sync_api import sync_playwright
+
+from config import BROWSER_SERVER_PORT, chrome_sandbox_disabled, get_chrome_args
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - [%(module)s] - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parses command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run a shared headless Chromium for the extractor workers (PLAYWRIGHT_CDP_URL).",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=BROWSER_SERVER_PORT, help="Remote debugging port.")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address the debugging port listens on. Anyone who can reach it controls the browser.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Launches Chromium and waits for it to exit. Returns its exit code."""
+    args = parse_arguments()
+    # Only used to locate the Chromium build installed by `playwright install chromium`
+    with sync_playwright() as playwright:
+        executable_path = playwright.chromium.executable_path
+
+    with tempfile.TemporaryDirectory(prefix="browser-server-") as profile_dir:
+        command = [
+            executable_path,
+            "--headless=new",
+            f"--remote-debugging-port={args.port}",
+            f"--remote-debugging-address={args.host}",
+            f"--user-data-dir={profile_dir}",
+            *get_chrome_args(),
+        ]
+        if chrome_sandbox_disabled():
+            logger.warning("PLAYWRIGHT_NO_SANDBOX is set: Chromium runs without its sandbox.")
+        logger.info("Starting Chromium. Set PLAYWRIGHT_CDP_URL=http://%s:%d for the workers.", args.host, args.port)
+        browser = subprocess.Popen(command)
+        try:
+            return browser.wait()
+        except KeyboardInterrupt:
+            logger.info("Stopping Chromium.")
+            browser.terminate()
+            return browser.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
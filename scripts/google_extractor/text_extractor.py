@@ -3,106 +3,512 @@
 
 """
 Functions for extracting main text content from URLs.
-Includes a requests-based version and a Playwright-based version for dynamic content.
+Includes a requests-based version, an aiohttp-based version for concurrent fetching,
+and a Playwright-based version for dynamic content.
 """
 
+import codecs
 import logging
 import asyncio
-from typing import Optional
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
+import aiohttp
 import requests
 import trafilatura
+import urllib3
+
+logger = logging.getLogger(__name__)
+
 try:
-    from playwright.async_api import async_playwright, Error as PlaywrightError
-    PLAYWRIGHT_AVAILABLE = True
-    logging.info("Playwright found and available.")
+    from resiliparse.extract.html2text import extract_plain_text
+    from resiliparse.parse.encoding import detect_encoding
+    from resiliparse.parse.html import HTMLTree
+    RESILIPARSE_AVAILABLE = True
 except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
-    PlaywrightError = Exception # Define a placeholder
-    logging.info("Playwright not found. JS rendering will not be available.")
+    RESILIPARSE_AVAILABLE = False
+    logger.info("resiliparse not found. Falling back to trafilatura for text extraction.")
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+    logger.info("selectolax not found. Pages are passed to trafilatura unfiltered.")
 
-from config import EXTRACTION_HEADERS, DEFAULT_EXTRACTION_TIMEOUT
+from browser_pool import PlaywrightPool, PlaywrightError, PLAYWRIGHT_AVAILABLE
+from config import (
+    EXTRACTION_HEADERS, DEFAULT_EXTRACTION_TIMEOUT, MAX_CONTENT_LENGTH, USE_RESILIPARSE, BLOCKED_RESOURCE_TYPES,
+    DEFAULT_PARSE_PROCESSES, PARSE_OFFLOAD_MIN_CHARS, DEFAULT_MAX_CONNECTIONS, PLAYWRIGHT_MAX_CONCURRENCY,
+    REQUESTS_LRU_SIZE, MAX_PARSE_BYTES, HOST_FAILURE_THRESHOLD, HOST_FAILURE_COOLDOWN, HOST_FAILURE_MAX_COOLDOWN
+)
+from http_session import build_pooled_session, build_connector
 
+# Content types worth parsing (matched as prefixes, so parameters like charset are ignored)
+_OK_CTYPES = ('text/html', 'application/xhtml', 'application/xml', 'text/xml')
 
-def extract_main_text_requests(url: str, timeout: int = DEFAULT_EXTRACTION_TIMEOUT) -> Optional[str]:
+# Reused for the process lifetime so connections to repeated hosts are kept alive
+_SESSION = build_pooled_session(headers=EXTRACTION_HEADERS)
+
+# Recent successful extract_main_text_requests results (URL -> text), least recently used first
+_REQUESTS_LRU: "OrderedDict[str, str]" = OrderedDict()
+_REQUESTS_LRU_LOCK = threading.Lock()
+
+# Circuit breaker: host -> (consecutive connection failures, time until which it is skipped).
+# Shared by the sync (threaded) and async extractors, hence the threading lock.
+_HOST_FAILS: Dict[str, Tuple[int, float]] = {}
+_HOST_FAILS_LOCK = threading.Lock()
+
+# Shared aiohttp session for extract_many, created lazily inside the running event loop
+_ASYNC_SESSION: Optional[aiohttp.ClientSession] = None
+_ASYNC_SESSION_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+# Shared browser for extract_main_text_playwright, launched on first use
+_PLAYWRIGHT_POOL = PlaywrightPool()
+
+# Process pool parsing rendered pages, started on first use
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+
+
+# Elements that never hold article text but can make up most of an oversized page
+_TRIMMED_TAGS = 'script, style, noscript, svg, template, iframe'
+
+
+# Boilerplate removed before trafilatura, and the containers that usually hold the article
+_PREFILTER_REMOVED = 'script, style, nav, footer, aside, iframe, noscript, svg, template'
+_PREFILTER_CONTAINER = 'main, article, [role=main]'
+
+
+def _prefilter_html(html_content: Union[str, bytes], encoding: Optional[str] = None) -> str:
     """
-    Fetches content from URL, extracts main text using trafilatura.
-    Uses lazy % formatting for logging. Returns text string or None on failure.
+    Cuts a document down to its main container (or <body>) without boilerplate elements,
+    using selectolax's lexbor parser, so trafilatura prunes a much smaller tree.
+
+    Returns:
+        The filtered markup as a full document, or the decoded document if it has no body.
     """
-    logging.debug("[Requests] Attempting text extraction from: %s", url)
-    try:
-        response = requests.get(url, headers=EXTRACTION_HEADERS, timeout=timeout, allow_redirects=True)
-        response.raise_for_status() # Check for HTTP errors (4xx, 5xx)
-        content_type = response.headers.get('content-type', '').lower()
+    if isinstance(html_content, bytes):
+        # Declared charset if Python knows it (servers send names like "utf8mb4"); otherwise let trafilatura's detection decide
+        try:
+            html_content = html_content.decode(codecs.lookup(encoding).name, errors='replace')
+        except (LookupError, TypeError):
+            html_content = trafilatura.utils.decode_file(html_content)
+    tree = LexborHTMLParser(html_content)
+    for node in tree.css(_PREFILTER_REMOVED):
+        node.decompose()
+    container = tree.css_first(_PREFILTER_CONTAINER)
+    if container is not None:
+        # Re-wrapped as a full document; trafilatura extracts less (or nothing) from bare fragments
+        return '<html><body>' + container.html + '</body></html>'
+    if tree.body is not None:
+        return '<html>' + tree.body.html + '</html>'
+    return html_content
+
+
+def _trim_large_html(html_content: Union[str, bytes], encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Cuts a document larger than MAX_PARSE_BYTES down to its <body>, without scripts,
+    styles and other non-text elements, so trafilatura's tree pruning stays fast on it.
+
+    Returns:
+        The trimmed markup, or None if the document cannot be trimmed (resiliparse missing).
+    """
+    if not RESILIPARSE_AVAILABLE:
+        return None
+    if isinstance(html_content, bytes):
+        tree = HTMLTree.parse_from_bytes(html_content, encoding or detect_encoding(html_content))
+    else:
+        tree = HTMLTree.parse(html_content)
+    if tree.body is None:
+        return None
+    for node in tree.body.query_selector_all(_TRIMMED_TAGS):
+        node.decompose()
+    # Re-wrapped as a full document; trafilatura extracts less (or nothing) from bare fragments
+    return '<html>' + tree.body.html + '</html>'
+
 
-        # Check if content type seems appropriate before parsing
-        if 'html' not in content_type and 'xml' not in content_type:
-            logging.warning("[Requests] Content type '%s' for URL %s not HTML/XML. Skipping extraction.", content_type, url)
-            return None
+def _parse_html(html_content: Union[str, bytes], encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Extracts main text from an HTML document using resiliparse, or trafilatura if
+    resiliparse is disabled (USE_RESILIPARSE) or not installed.
+    Synchronous and CPU-bound; async callers should run it in an executor.
+    Module-level so it can also be sent to a process pool.
 
-        html_content = response.text
-        if not html_content:
-            logging.warning("[Requests] No HTML/text content retrieved from %s", url)
-            return None
+    Args:
+        html_content: The document, decoded or as the raw response body. Raw bytes are
+            decoded by the parser itself, which avoids a separate decoding pass.
+        encoding: Charset declared by the server for raw bytes; detected if None.
 
-        # Use trafilatura for extraction
+    Returns:
+        The stripped text or None if nothing was extracted.
+    """
+    if USE_RESILIPARSE and RESILIPARSE_AVAILABLE:
+        if isinstance(html_content, bytes):
+            tree = HTMLTree.parse_from_bytes(html_content, encoding or detect_encoding(html_content))
+        else:
+            tree = HTMLTree.parse(html_content)
+        main_text = extract_plain_text(tree, main_content=True, preserve_formatting=False)
+    else:
+        # One pre-pass over the raw input: the selectolax pre-filter already strips the
+        # script/style bulk of oversized pages, so the resiliparse trim is only its stand-in
+        if SELECTOLAX_AVAILABLE:
+            html_content = _prefilter_html(html_content, encoding)
+        elif len(html_content) > MAX_PARSE_BYTES:
+            trimmed = _trim_large_html(html_content, encoding)
+            if trimmed is None:
+                logger.warning("Skipping parse of a %d byte document (limit %d, no selectolax/resiliparse to trim it).",
+                               len(html_content), MAX_PARSE_BYTES)
+                return None
+            html_content = trimmed
+        # Trafilatura detects the encoding of raw bytes on its own
         # Consider adding error_recovery=True for more resilience if needed
         main_text = trafilatura.extract(
             html_content,
             include_comments=False,
             include_tables=True, # Adjust as needed
-            output_format='txt'
+            output_format='txt',
+            fast=True, # Skip the readability/jusText fallback extractors, which re-parse the page
+            with_metadata=False # Text only: no htmldate/metadata pass over the document
             # target_language='en' # Optional: specify if known
         )
+    return main_text.strip() if main_text else None # Remove leading/trailing whitespace
 
-        if main_text:
-            logging.debug("[Requests] Successfully extracted text from: %s", url)
-            return main_text.strip() # Remove leading/trailing whitespace
 
-        # It's not necessarily an error if a page has no extractable main text
-        logging.info("[Requests] Trafilatura found no main text in: %s", url)
+def get_parse_pool(max_workers: int = DEFAULT_PARSE_PROCESSES) -> ProcessPoolExecutor:
+    """
+    Returns the process-wide HTML parsing pool, starting it on first use.
+    Shared by extract_main_text_playwright and callers passing it as `parse_executor`.
+
+    Args:
+        max_workers: Number of worker processes; only applies when the pool is started.
+    """
+    global _PARSE_POOL
+    if _PARSE_POOL is None:
+        # Spawned rather than forked, since threads (executors, writers) may already be running
+        _PARSE_POOL = ProcessPoolExecutor(
+            max_workers=max(max_workers, 1), mp_context=multiprocessing.get_context('spawn')
+        )
+    return _PARSE_POOL
+
+
+def shutdown_parse_pool() -> None:
+    """Stops the HTML parsing process pool (see get_parse_pool), if it was started."""
+    global _PARSE_POOL
+    if _PARSE_POOL is not None:
+        _PARSE_POOL.shutdown(wait=True)
+        _PARSE_POOL = None
+
+
+async def _parse_html_async(
+    html_content: Union[str, bytes],
+    parse_executor: Optional[Executor] = None,
+    encoding: Optional[str] = None
+) -> Optional[str]:
+    """
+    Runs _parse_html off the event loop. Documents shorter than PARSE_OFFLOAD_MIN_CHARS always
+    use the loop's default (thread) executor, since sending them to a process costs more than parsing.
+    """
+    executor = parse_executor if len(html_content) >= PARSE_OFFLOAD_MIN_CHARS else None
+    return await asyncio.get_running_loop().run_in_executor(executor, _parse_html, html_content, encoding)
+
+
+def _charset_from_content_type(content_type: str) -> Optional[str]:
+    """Returns the charset parameter of a Content-Type header value, or None if not declared."""
+    for parameter in content_type.split(';')[1:]:
+        key, _, value = parameter.partition('=')
+        if key.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def _host_of(url: str) -> str:
+    """Returns the circuit breaker key (lowercased host[:port]) of a URL."""
+    return urlsplit(url).netloc.lower()
+
+
+def _host_is_open(host: str) -> bool:
+    """True if `host` is currently being skipped after repeated connection failures."""
+    with _HOST_FAILS_LOCK:
+        _, skip_until = _HOST_FAILS.get(host, (0, 0.0))
+    return time.monotonic() < skip_until
+
+
+def _record_host_failure(host: str) -> None:
+    """
+    Counts a connection failure or timeout for `host`. From HOST_FAILURE_THRESHOLD consecutive
+    failures on, the host is skipped for HOST_FAILURE_COOLDOWN seconds, doubling each time.
+    """
+    with _HOST_FAILS_LOCK:
+        failures = _HOST_FAILS.get(host, (0, 0.0))[0] + 1
+        skip_until = 0.0
+        if failures >= HOST_FAILURE_THRESHOLD:
+            cooldown = min(HOST_FAILURE_COOLDOWN * 2 ** (failures - HOST_FAILURE_THRESHOLD), HOST_FAILURE_MAX_COOLDOWN)
+            skip_until = time.monotonic() + cooldown
+            logger.warning("Host %s failed %d times in a row. Skipping it for %.0f seconds.", host, failures, cooldown)
+        _HOST_FAILS[host] = (failures, skip_until)
+
+
+def _record_host_success(host: str) -> None:
+    """Resets the failure count of `host` once it answered a request."""
+    if host in _HOST_FAILS: # Unlocked pre-check; the common case needs no lock
+        with _HOST_FAILS_LOCK:
+            _HOST_FAILS.pop(host, None)
+
+
+def _header_skip_reason(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Checks response headers before the body is downloaded.
+    Returns why the response should not be parsed, or None if it looks like an extractable page.
+    """
+    content_type = headers.get('content-type', '')
+    if not content_type.lower().startswith(_OK_CTYPES):
+        return f"content type '{content_type}' is not HTML/XML"
+    content_length = headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > MAX_CONTENT_LENGTH:
+        return f"content length {content_length} exceeds {MAX_CONTENT_LENGTH} bytes"
+    return None
+
+
+def extract_main_text_requests(url: str, timeout: int = DEFAULT_EXTRACTION_TIMEOUT) -> Optional[str]:
+    """
+    Returns the main text of URL, reusing the result of a recent successful call for the same
+    URL (up to REQUESTS_LRU_SIZE are kept in memory). Failures are not cached, so they are retried.
+    Thread-safe.
+    """
+    with _REQUESTS_LRU_LOCK:
+        main_text = _REQUESTS_LRU.get(url)
+        if main_text is not None:
+            _REQUESTS_LRU.move_to_end(url)
+            return main_text
+
+    main_text = _extract_main_text_requests_uncached(url, timeout)
+    if main_text is not None:
+        with _REQUESTS_LRU_LOCK:
+            _REQUESTS_LRU[url] = main_text
+            _REQUESTS_LRU.move_to_end(url)
+            if len(_REQUESTS_LRU) > REQUESTS_LRU_SIZE:
+                _REQUESTS_LRU.popitem(last=False)
+    return main_text
+
+
+def _extract_main_text_requests_uncached(url: str, timeout: int) -> Optional[str]:
+    """
+    Fetches content from URL, extracts main text (see _parse_html).
+    The raw body (at most MAX_CONTENT_LENGTH bytes) is handed to the parser undecoded.
+    Uses lazy % formatting for logging. Returns text string or None on failure.
+    """
+    host = _host_of(url)
+    if _host_is_open(host):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Requests] Skipping %s: host %s is failing.", url, host)
         return None
 
-    except requests.exceptions.Timeout:
-        logging.error("[Requests] Timeout occurred while fetching URL for extraction: %s", url)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Requests] Attempting text extraction from: %s", url)
+    try:
+        # Streamed, so the body is only downloaded once the headers pass the checks
+        with _SESSION.get(url, timeout=timeout, allow_redirects=True, stream=True) as response:
+            if not response.ok:
+                logger.warning("[Requests] HTTP %d for %s", response.status_code, url)
+                return None
+
+            # Check if the response seems appropriate before downloading and parsing it
+            skip_reason = _header_skip_reason(response.headers)
+            if skip_reason:
+                logger.warning("[Requests] Skipping extraction for %s: %s.", url, skip_reason)
+                return None
+
+            # Read one byte past the limit to tell a body of exactly the limit from a larger one
+            html_content = response.raw.read(MAX_CONTENT_LENGTH + 1, decode_content=True)
+            encoding = _charset_from_content_type(response.headers.get('content-type', ''))
+        # Only after the body: a host that answers headers and then stalls still counts as failing
+        _record_host_success(host)
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+        # Log request errors (timeouts, redirects, connection and read errors) but allow the main script to continue.
+        # Body reads go through response.raw, whose urllib3 errors requests does not wrap.
+        logger.error("[Requests] Extraction error fetching %s: %s %s", url, type(e).__name__, e)
+        if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                          urllib3.exceptions.ReadTimeoutError, urllib3.exceptions.ProtocolError)):
+            _record_host_failure(host)
         return None
-    except requests.exceptions.TooManyRedirects:
-        logging.error("[Requests] Too many redirects for URL: %s", url)
+
+    if len(html_content) > MAX_CONTENT_LENGTH:
+        logger.warning("[Requests] Skipping extraction for %s: body exceeds %d bytes.", url, MAX_CONTENT_LENGTH)
         return None
-    except requests.exceptions.RequestException as e:
-        # Log other request errors but allow the main script to continue
-        logging.error("[Requests] Extraction error fetching %s: %s", url, e)
+    if not html_content:
+        logger.warning("[Requests] No HTML/text content retrieved from %s", url)
         return None
+
+    try:
+        # Extract the main text (resiliparse or trafilatura)
+        main_text = _parse_html(html_content, encoding)
     except Exception as e:
-        # Catch potential trafilatura or other unexpected errors
-        logging.error(
-            "[Requests] Unexpected error during text extraction for %s: %s",
+        # Parser errors on a malformed page should not stop the other extractions
+        logger.error("[Requests] Unexpected error during text extraction for %s: %s", url, e)
+        return None
+
+    if main_text:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Requests] Successfully extracted text from: %s", url)
+        return main_text
+
+    # It's not necessarily an error if a page has no extractable main text
+    logger.info("[Requests] No main text found in: %s", url)
+    return None
+
+
+# --- Async aiohttp-based function ---
+async def extract_main_text_aiohttp(
+    session: aiohttp.ClientSession,
+    url: str,
+    timeout: int = DEFAULT_EXTRACTION_TIMEOUT,
+    parse_executor: Optional[Executor] = None
+) -> Optional[str]:
+    """
+    Fetches URL through a shared aiohttp session, then extracts main text (see _parse_html).
+    Parsing runs in an executor so the event loop keeps serving other fetches.
+
+    Args:
+        session: An open aiohttp session, reused across requests.
+        url: The URL to process.
+        timeout: Timeout for connecting and for each read from the socket (seconds).
+        parse_executor: Executor running the HTML parsing. A ProcessPoolExecutor lets
+            parses run in parallel outside the GIL; None uses the loop's default executor.
+            Small documents always use the default executor (see _parse_html_async).
+
+    Returns:
+        Extracted text string or None on failure.
+    """
+    host = _host_of(url)
+    if _host_is_open(host):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Aiohttp] Skipping %s: host %s is failing.", url, host)
+        return None
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Aiohttp] Attempting text extraction from: %s", url)
+    try:
+        async with session.get(
             url,
-            e,
-            exc_info=False) # Set exc_info=True for full traceback if needed
+            headers=EXTRACTION_HEADERS,
+            # No total deadline: it would also count the wait for a free pooled connection
+            # (CONNECTOR_LIMIT_PER_HOST), timing out healthy hosts when many URLs share one
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout),
+            allow_redirects=True
+        ) as response:
+            if response.status >= 400:
+                logger.warning("[Aiohttp] HTTP %d for %s", response.status, url)
+                return None
+
+            # Check if the response seems appropriate before downloading the body
+            skip_reason = _header_skip_reason(response.headers)
+            if skip_reason:
+                logger.warning("[Aiohttp] Skipping extraction for %s: %s.", url, skip_reason)
+                return None
+
+            # Raw (decompressed) bytes, read up to the size cap; the parser decodes them (see _parse_html)
+            chunks = []
+            body_size = 0
+            async for chunk in response.content.iter_chunked(1 << 16):
+                body_size += len(chunk)
+                if body_size > MAX_CONTENT_LENGTH:
+                    logger.warning("[Aiohttp] Skipping extraction for %s: body exceeds %d bytes.", url, MAX_CONTENT_LENGTH)
+                    return None
+                chunks.append(chunk)
+            html_content = b''.join(chunks)
+            encoding = response.charset
+        # Only after the body: a host that answers headers and then stalls still counts as failing
+        _record_host_success(host)
+
+    except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+        # Log request errors (timeouts, redirects, connection errors) but allow the main script to continue
+        logger.error("[Aiohttp] Extraction error fetching %s: %s %s", url, type(e).__name__, e)
+        # Only failures of the host itself: connect/read timeouts arrive as ServerTimeoutError (a
+        # ClientConnectionError). A bare TimeoutError may include time spent queued locally.
+        if isinstance(e, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+            _record_host_failure(host)
+        return None
+
+    if not html_content:
+        logger.warning("[Aiohttp] No HTML/text content retrieved from %s", url)
+        return None
+
+    try:
+        # Parsing is sync and CPU-bound, keep it off the event loop
+        main_text = await _parse_html_async(html_content, parse_executor, encoding)
+    except Exception as e:
+        logger.error("[Aiohttp] Unexpected error during text extraction for %s: %s", url, e)
         return None
 
+    if main_text:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[Aiohttp] Successfully extracted text from: %s", url)
+        return main_text
+
+    logger.info("[Aiohttp] No main text found in: %s", url)
+    return None
+
+
+def _get_async_session() -> aiohttp.ClientSession:
+    """
+    Returns the shared aiohttp session, creating it on first use in the running loop
+    (or again if it was closed or belongs to a previous event loop).
+    """
+    global _ASYNC_SESSION, _ASYNC_SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _ASYNC_SESSION is None or _ASYNC_SESSION.closed or _ASYNC_SESSION_LOOP is not loop:
+        _ASYNC_SESSION = aiohttp.ClientSession(connector=build_connector())
+        _ASYNC_SESSION_LOOP = loop
+    return _ASYNC_SESSION
+
+
+async def close_async_session() -> None:
+    """Closes the shared aiohttp session used by extract_many, if it was created."""
+    global _ASYNC_SESSION, _ASYNC_SESSION_LOOP
+    if _ASYNC_SESSION is not None and not _ASYNC_SESSION.closed:
+        await _ASYNC_SESSION.close()
+    _ASYNC_SESSION = None
+    _ASYNC_SESSION_LOOP = None
+
 
 # --- Async Playwright-based function ---
+async def _block_resources(route) -> None:
+    """Playwright route handler: aborts requests for BLOCKED_RESOURCE_TYPES, lets the rest through."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 async def extract_main_text_playwright(
     url: str,
     timeout: int = 30,
-    wait_seconds: float = 2.0
+    wait_seconds: float = 2.0,
+    wait_selector: Optional[str] = None
 ) -> Optional[str]:
     """
-    Fetches URL using Async Playwright (renders JS), waits, then extracts text.
+    Fetches URL using Async Playwright (renders JS), waits for dynamic content, then extracts text.
     Handles dynamic content but requires Playwright setup and async execution.
+    Pages are rendered in a fresh context of a shared browser (see close_playwright_pool).
 
     Args:
         url: The URL to process.
         timeout: Overall timeout for Playwright navigation/operations (seconds).
-        wait_seconds: Explicit time to wait after initial load (seconds).
+        wait_seconds: Typical wait for dynamic content after the initial load (seconds).
+            The page is awaited until the network is idle (or `wait_selector` appears),
+            for at most twice this long. 0 or less skips the wait.
+        wait_selector: Optional CSS selector of an element holding the content;
+            waiting for it is more precise than waiting for network idle.
 
     Returns:
         Extracted text string or None on failure.
     """
     if not PLAYWRIGHT_AVAILABLE:
-        logging.error("Playwright is not installed. Cannot use async Playwright extraction.")
+        logger.error("Playwright is not installed. Cannot use async Playwright extraction.")
         # Fallback could potentially call the sync requests version, but needs care in async context
         # Option 1: Just return None
         return None
@@ -111,69 +517,124 @@ async def extract_main_text_playwright(
         # return await loop.run_in_executor(None, extract_main_text_requests, url, timeout)
 
 
-    logging.debug("[Playwright][Async] Attempting extraction for: %s", url)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Playwright][Async] Attempting extraction for: %s", url)
     html_content = None
-    browser = None # Initialize browser variable
 
     try:
-        # Use async context manager and await calls
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent=EXTRACTION_HEADERS['User-Agent'],
-                java_script_enabled=True,
-                ignore_https_errors=True # Use with caution
-            )
+        # The context (and its pages) is closed on exit; the browser stays up for reuse
+        async with _PLAYWRIGHT_POOL.acquire(
+            user_agent=EXTRACTION_HEADERS['User-Agent'],
+            java_script_enabled=True,
+            ignore_https_errors=True, # Use with caution
+            bypass_csp=True,
+            service_workers="block" # Avoid background fetches; also required for routing all requests
+        ) as context:
+            # Skip images, fonts, media and styles, which do not affect the extracted text
+            await context.route("**/*", _block_resources)
             # Apply timeouts directly to context actions if needed, or rely on default
             # context.set_default_navigation_timeout(timeout * 1000) # Set for context
             # context.set_default_timeout(timeout * 1000)         # Set for context
 
             page = await context.new_page()
-            logging.debug("[Playwright][Async] Navigating to %s", url)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[Playwright][Async] Navigating to %s", url)
             # Navigate with potentially adjusted timeout for the specific goto action
             await page.goto(url, timeout=timeout * 1000, wait_until='domcontentloaded')
 
-            # *** Use asyncio.sleep for non-blocking wait ***
-            logging.info("[Playwright][Async] Waiting %.1f seconds for dynamic content on %s...", wait_seconds, url)
-            await asyncio.sleep(wait_seconds)
+            # Wait for dynamic content, but only as long as needed
+            if wait_seconds > 0:
+                # At least 1 ms: Playwright treats a timeout of 0 as "wait forever"
+                wait_timeout_ms = max(int(wait_seconds * 1000 * 2), 1)
+                try:
+                    if wait_selector:
+                        await page.wait_for_selector(wait_selector, timeout=wait_timeout_ms)
+                    else:
+                        await page.wait_for_load_state('networkidle', timeout=wait_timeout_ms)
+                except PlaywrightError:
+                    # Timed out (e.g. long-polling pages): use whatever has rendered so far
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("[Playwright][Async] Dynamic content wait timed out for %s", url)
 
             # Get the page's HTML content *after* JS execution and waiting
             html_content = await page.content()
-            logging.debug("[Playwright][Async] HTML content retrieved for %s", url)
-
-            # Close context and browser gracefully
-            await context.close()
-            await browser.close()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[Playwright][Async] HTML content retrieved for %s", url)
 
     except PlaywrightError as e:
         # Catch specific Playwright errors (TimeoutError, etc.)
-        logging.error("[Playwright][Async] Playwright error for %s: %s", url, e)
-        if browser and browser.is_connected():
-            await browser.close() # Ensure cleanup
+        logger.error("[Playwright][Async] Playwright error for %s: %s", url, e)
         return None
     except Exception as e:
         # Catch any other unexpected errors
-        logging.error("[Playwright][Async] Unexpected error during Playwright processing for %s: %s", url, e, exc_info=False)
-        if browser and browser.is_connected():
-            await browser.close() # Ensure cleanup
+        logger.error("[Playwright][Async] Unexpected error during Playwright processing for %s: %s", url, e, exc_info=False)
         return None
 
-    # --- Trafilatura extraction (still synchronous CPU-bound task) ---
-    # Running this directly is usually fine unless it's extremely slow.
-    # For very heavy parsing, could consider loop.run_in_executor
+    # --- Main text extraction (CPU-bound, runs in the parsing process pool) ---
     if not html_content:
-        logging.warning("[Playwright][Async] No HTML content retrieved via Playwright from %s", url)
+        logger.warning("[Playwright][Async] No HTML content retrieved via Playwright from %s", url)
         return None
 
-    logging.debug("[Playwright][Async] Starting Trafilatura extraction on rendered HTML for %s", url)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Playwright][Async] Starting main text extraction on rendered HTML for %s", url)
     try:
-        # Trafilatura itself is sync
-        main_text = trafilatura.extract(html_content, include_comments=False, include_tables=True, output_format='txt')
+        # The parser itself is sync, keep it off the event loop
+        main_text = await _parse_html_async(html_content, get_parse_pool())
         if main_text:
-            logging.debug("[Playwright][Async] Successfully extracted text via Trafilatura from: %s", url)
-            return main_text.strip()
-        logging.info("[Playwright][Async] Trafilatura found no main text via Playwright in: %s", url)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[Playwright][Async] Successfully extracted text from: %s", url)
+            return main_text
+        logger.info("[Playwright][Async] No main text found via Playwright in: %s", url)
         return None
     except Exception as e:
-        logging.error("[Playwright][Async] Error during Trafilatura extraction after Playwright for %s: %s", url, e)
-        return None
\ No newline at end of file
+        logger.error("[Playwright][Async] Error during text extraction after Playwright for %s: %s", url, e)
+        return None
+
+
+async def close_playwright_pool() -> None:
+    """Closes the shared browser used by extract_main_text_playwright, if it was launched."""
+    await _PLAYWRIGHT_POOL.close()
+
+
+# --- Batch extraction ---
+async def extract_many(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    use_playwright: bool = False,
+    timeout: int = DEFAULT_EXTRACTION_TIMEOUT
+) -> Dict[str, Optional[str]]:
+    """
+    Extracts main text from many URLs concurrently, with at most `concurrency` in flight.
+    Plain HTTP fetches share one keep-alive aiohttp session (see close_async_session);
+    Playwright renders share the pooled browser (see close_playwright_pool).
+
+    Args:
+        urls: The URLs to process.
+        concurrency: Maximum extractions in flight. Defaults to DEFAULT_MAX_CONNECTIONS for
+            HTTP and PLAYWRIGHT_MAX_CONCURRENCY (the browser pool size) for Playwright.
+        use_playwright: Render pages with Playwright instead of fetching them over HTTP.
+        timeout: Timeout per URL (seconds).
+
+    Returns:
+        Mapping of each URL to its extracted text, or None on failure.
+    """
+    if concurrency is None:
+        concurrency = PLAYWRIGHT_MAX_CONCURRENCY if use_playwright else DEFAULT_MAX_CONNECTIONS
+    semaphore = asyncio.Semaphore(concurrency)
+    session = None if use_playwright else _get_async_session()
+
+    async def _extract_one(url: str) -> Optional[str]:
+        async with semaphore:
+            if use_playwright:
+                return await extract_main_text_playwright(url, timeout=timeout)
+            return await extract_main_text_aiohttp(session, url, timeout=timeout)
+
+    unique_urls = list(dict.fromkeys(urls))
+    outcomes = await asyncio.gather(*(_extract_one(url) for url in unique_urls), return_exceptions=True)
+    results: Dict[str, Optional[str]] = {}
+    for url, outcome in zip(unique_urls, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("Unexpected error extracting URL %s: %s", url, outcome)
+            outcome = None
+        results[url] = outcome
+    return results
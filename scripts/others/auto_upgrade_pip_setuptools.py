@@ -1,13 +1,61 @@
 #!.venv/Scripts/python
 
+import json
+import os
 import subprocess
 import sys
+import tempfile
+import time
+import urllib.request
+from importlib.metadata import PackageNotFoundError, version
+
+PACKAGES = ("pip", "setuptools")
+PYPI_JSON_URL = "https://pypi.org/pypi/{}/json"
+PYPI_TIMEOUT = 5 # Seconds per PyPI request
+CACHE_PATH = os.path.join(tempfile.gettempdir(), "pypi_latest_versions.json")
+CACHE_TTL = 24 * 3600 # Seconds before the cached latest versions are fetched again
+
+def latest_versions():
+    """Returns {package: latest version on PyPI}, cached on disk for CACHE_TTL seconds."""
+    try:
+        if time.time() - os.path.getmtime(CACHE_PATH) < CACHE_TTL:
+            with open(CACHE_PATH, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if all(name in cached for name in PACKAGES):
+                return cached
+    except (OSError, ValueError):
+        pass
+
+    latest = {}
+    for name in PACKAGES:
+        with urllib.request.urlopen(PYPI_JSON_URL.format(name), timeout=PYPI_TIMEOUT) as response:
+            latest[name] = json.load(response)["info"]["version"]
+    try:
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(latest, f)
+    except OSError:
+        pass
+    return latest
+
+def is_up_to_date():
+    """True if the installed pip and setuptools match the latest PyPI releases."""
+    try:
+        installed = {name: version(name) for name in PACKAGES}
+        latest = latest_versions()
+    except (PackageNotFoundError, OSError, ValueError, KeyError) as e:
+        print(f"Could not check versions ({e}). Upgrading anyway.")
+        return False
+    return installed == latest
 
 def update_pip_setuptools():
     """Main function"""
+    if is_up_to_date():
+        print("pip and setuptools are already up to date.")
+        return
     subprocess.check_call([
         sys.executable, "-m",
-        "pip", "install", "--upgrade", "pip", "setuptools"
+        "pip", "install", "--upgrade", "--disable-pip-version-check", "--no-input", "-q",
+        *PACKAGES
     ])
 
 if __name__ == "__main__":